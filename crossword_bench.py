@@ -0,0 +1,242 @@
+"""
+Benchmark the crossword generator and write the results as JSON.
+
+Every corpus (the real crucigrama.json plus synthetic ones of 1k, 10k and
+100k entries) runs build_daily_crossword over consecutive ISO weeks and
+build_quick_crossword over fixed seeds. Latency comes from a plain run;
+memory peaks from a second, traced run of the same inputs. Results are
+reported per corpus and mode, and per pattern within each, and can be
+compared with an earlier results file:
+
+    python crossword_bench.py --weeks 20 --quick 50 --out bench.json
+    python crossword_bench.py --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import web_app
+from crossword_engine import iter_entries
+from puzzle_store import PuzzleStore
+
+SYNTHETIC_SIZES = {"1k": 1000, "10k": 10000, "100k": 100000}
+
+
+def synthetic_entries(base, count, seed=0):
+    """
+    *count* made-up entries whose answers follow the letter bigrams and
+    length mix of *base*, so the fill sees a corpus shaped like the real one.
+    """
+    rnd = random.Random(seed)
+    words = [e["answer"] for e in base if len(e["answer"]) >= 3]
+    lengths = [len(w) for w in words]
+    follow = {}
+    for w in words:
+        for a, b in zip("^" + w, w + "$"):
+            follow.setdefault(a, []).append(b)
+    entries = []
+    while len(entries) < count:
+        n = rnd.choice(lengths)
+        word, ch = "", "^"
+        while len(word) < n:
+            ch = rnd.choice(follow[ch])
+            if ch == "$":
+                ch = "^"
+                continue
+            word += ch
+        entries.append({"clue": f"Sintética {len(entries) + 1}", "answer": word})
+    return entries
+
+
+def percentiles(values):
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {"p50": at(0.5), "p90": at(0.9), "p99": at(0.99), "max": ordered[-1],
+            "mean": round(sum(ordered) / len(ordered), 1)}
+
+
+def summarise(runs):
+    """Latency percentiles (ms), completeness and memory peak (KiB) of some runs."""
+    return {
+        "runs": len(runs),
+        "latency_ms": percentiles([r["ms"] for r in runs]),
+        "complete_rate": round(sum(r["complete"] for r in runs) / len(runs), 3),
+        "fill_ratio": round(sum(r["ratio"] for r in runs) / len(runs), 3),
+        "peak_kib": percentiles([r["peak_kib"] for r in runs]),
+    }
+
+
+def _use_corpus(path, workdir):
+    """
+    Point the generator at the corpus in *path* and return its index.
+
+    Weekly puzzles go to a store under *workdir*, so the benchmark never
+    touches (nor reads from) the production puzzle store.
+    """
+    compiled = os.path.join(workdir, os.path.basename(path) + ".bin")
+    web_app._corpus = web_app.CorpusManager(path, compiled, web_app.CROSSWORD_BACKEND)
+    web_app._puzzle_store = PuzzleStore(os.path.join(workdir, "crucigramas"))
+    web_app._daily_cache.clear()
+    return web_app.load_word_index()
+
+
+def _run(build, records, traced):
+    # Both caches emptied, so every run generates
+    web_app._daily_cache.clear()
+    shutil.rmtree(web_app._puzzle_store.root, ignore_errors=True)
+    records.clear()
+    if traced:
+        tracemalloc.start()
+    started = time.perf_counter()
+    build()
+    ms = (time.perf_counter() - started) * 1000
+    peak = 0
+    if traced:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return ms, peak, records[-1]
+
+
+def bench_corpus(path, workdir, weeks, quick, budget, records):
+    started = time.perf_counter()
+    index = _use_corpus(path, workdir)
+    load_ms = round((time.perf_counter() - started) * 1000, 1)
+    first = date.fromisocalendar(2026, 1, 1)
+    jobs = (
+        [("weekly", lambda d=first + timedelta(weeks=k): web_app.build_daily_crossword(d, budget))
+         for k in range(weeks)]
+        + [("quick", lambda s=seed: web_app.build_quick_crossword(budget, seed=s))
+           for seed in range(quick)]
+    )
+    runs = []
+    for mode, build in jobs:
+        ms, _, record = _run(build, records, traced=False)
+        _, peak, _ = _run(build, records, traced=True)
+        runs.append({
+            "mode": mode,
+            "pattern": record["pattern"],
+            "ms": round(ms, 1),
+            "peak_kib": peak // 1024,
+            "complete": record["fill"]["complete"],
+            "ratio": record["fill"]["ratio"],
+            "counters": record["counters"],
+            "phase_counters": record["phase_counters"],
+        })
+
+    modes = {}
+    for mode in ("weekly", "quick"):
+        mode_runs = [r for r in runs if r["mode"] == mode]
+        if not mode_runs:
+            continue
+        by_pattern = {}
+        for r in mode_runs:
+            by_pattern.setdefault(r["pattern"], []).append(r)
+        modes[mode] = dict(summarise(mode_runs), patterns={
+            str(p): summarise(rs) for p, rs in sorted(by_pattern.items())
+        })
+    return {
+        "entries": sum(index.stats.counts.values()),
+        "load_ms": load_ms,
+        "modes": modes,
+        "runs": runs,
+    }
+
+
+def compare(results, baseline):
+    """Print p50 latency and completeness against a baseline results file."""
+    for name, corpus in results["corpora"].items():
+        old_corpus = baseline.get("corpora", {}).get(name)
+        if not old_corpus:
+            continue
+        for mode, stats in corpus["modes"].items():
+            old = old_corpus["modes"].get(mode)
+            if not old:
+                continue
+            p50, old_p50 = stats["latency_ms"]["p50"], old["latency_ms"]["p50"]
+            change = (p50 - old_p50) / old_p50 * 100 if old_p50 else 0.0
+            print(f"{name:>5} {mode:<6} p50 {old_p50:8.1f} -> {p50:8.1f} ms ({change:+.0f}%)  "
+                  f"completo {old['complete_rate']:.0%} -> {stats['complete_rate']:.0%}  "
+                  f"relleno {old['fill_ratio']:.0%} -> {stats['fill_ratio']:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=20, help="ISO weeks of weekly crosswords")
+    parser.add_argument("--quick", type=int, default=50, help="seeds of quick crosswords")
+    parser.add_argument("--corpora", default="real,1k,10k,100k",
+                        help="comma-separated: real and/or " + ", ".join(SYNTHETIC_SIZES))
+    parser.add_argument("--budget", type=float, default=None,
+                        help="seconds per generation (default: crucigrama.tiempo_max)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic corpora")
+    parser.add_argument("--out", default="crossword_bench.json")
+    parser.add_argument("--baseline", default=None, help="earlier results file to compare with")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        # Read first: --out may name the same file
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    records = []
+    web_app.add_generation_hook(records.append)
+    base = list(iter_entries(web_app.WORDS_FILE))
+    results = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": {
+            "fill_mode": web_app.CROSSWORD_FILL_MODE,
+            "backend": web_app.CROSSWORD_BACKEND,
+            "workers": web_app.CROSSWORD_WORKERS,
+            "repair_rounds": web_app.CROSSWORD_REPAIR_ROUNDS,
+            "budget": args.budget if args.budget is not None else web_app.CROSSWORD_TIME_BUDGET,
+        },
+        "weeks": args.weeks,
+        "quick_seeds": args.quick,
+        "corpora": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.corpora.split(","):
+            name = name.strip()
+            if name == "real":
+                path = web_app.WORDS_FILE
+            elif name in SYNTHETIC_SIZES:
+                path = os.path.join(workdir, f"synthetic-{name}.json")
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(synthetic_entries(base, SYNTHETIC_SIZES[name], args.seed), f,
+                              ensure_ascii=False)
+            else:
+                sys.exit(f"corpus desconocido: {name}")
+            corpus = bench_corpus(path, workdir, args.weeks, args.quick, args.budget, records)
+            results["corpora"][name] = corpus
+            for mode, stats in corpus["modes"].items():
+                lat = stats["latency_ms"]
+                print(f"{name:>5} {mode:<6} {corpus['entries']:>6} palabras  "
+                      f"p50 {lat['p50']:7.1f}  p90 {lat['p90']:7.1f}  p99 {lat['p99']:7.1f} ms  "
+                      f"completo {stats['complete_rate']:.0%}  relleno {stats['fill_ratio']:.0%}  "
+                      f"pico {stats['peak_kib']['max']} KiB")
+
+    tmp = args.out + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, args.out)
+    print(f"resultados guardados en {args.out}")
+
+    if baseline is not None:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
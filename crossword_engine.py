@@ -0,0 +1,1275 @@
+"""
+Crossword fill engine — corpus indexes and search helpers.
+
+Provides:
+    compile_pattern(pattern)        → GridGeometry, cached per pattern
+    GridState(size)                 → flat bytearray grid of letter codes
+    WordIndex(entries)              → positional (length, position, letter) index
+    make_index(entries, backend)    → WordIndex or NumpyWordIndex ("numpy")
+    iter_entries(path)              → corpus file entries, streamed and normalised
+    compile_corpus(entries, path)   → deduplicated binary corpus file
+    load_compiled(path, backend)    → memory-mapped CompiledIndex over that file
+    rank_patterns(geometries, stats) → patterns ordered by estimated fillability
+    generate_pattern(size, rnd)     → new symmetric pattern (see crossword_patterns.py)
+    solve(lengths, crossings, ...)  → complete fill, infeasibility proof or best partial
+    place_pinned(geometry, ...)     → slots for words that must appear, for solve(fixed=)
+    repair(lengths, crossings, ...) → partial fill improved by neighbourhood search
+    iter_bits(mask)                 → ids of the set bits of an int bitset
+    sample_bits(mask, k, rnd, size) → up to k random ids of the set bits
+
+Candidate sets are plain Python ints used as bitsets: bit *i* of a mask for
+length *n* stands for the *i*-th entry of that length in the index, so the
+words matching a slot are the AND of one mask per known letter.
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the "numpy" backend needs it
+    np = None
+
+
+# ── Bitset helpers ───────────────────────────────────────────────────────────
+
+def iter_bits(mask):
+    """Yield the ids of the set bits of *mask*, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def sample_bits(mask, k, rnd, size):
+    """
+    Return up to *k* distinct random ids from *mask* (a bitset over *size* ids).
+
+    Sparse masks are materialised and shuffled; dense ones are rejection
+    sampled so an unconstrained slot never walks the whole bucket.
+    """
+    count = mask.bit_count()
+    if count <= 4 * k or 2 * count < size:
+        ids = list(iter_bits(mask))
+        rnd.shuffle(ids)
+        return ids[:k]
+    picked = []
+    seen = set()
+    while len(picked) < k:
+        i = rnd.randrange(size)
+        if i not in seen and (mask >> i) & 1:
+            seen.add(i)
+            picked.append(i)
+    return picked
+
+
+def _pack(ids, size):
+    """Build an int bitset with the given ids set."""
+    buf = bytearray((size + 7) // 8)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+# ── Grid geometry ────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class Slot:
+    orient: str     # "horizontal" | "vertical"
+    row: int
+    col: int
+    length: int
+    cells: tuple    # flat cell indices (row * size + col)
+    step: int       # 1 for horizontal, grid size for vertical
+
+    @property
+    def span(self):
+        """Slice of the flat grid covering this slot."""
+        return slice(self.cells[0], self.cells[-1] + 1, self.step)
+
+
+@dataclass(frozen=True)
+class GridGeometry:
+    """
+    Everything about a pattern that does not depend on the words in it.
+
+    crossings[i] lists (other_slot, pos_in_i, pos_in_other) for every slot
+    crossing slot i; black holds (row, col) of the black cells.
+    """
+    size: int
+    slots: tuple
+    lengths: tuple
+    crossings: tuple
+    black: frozenset
+
+
+def crossings_of(cells_per_slot):
+    """
+    Build the crossing table for a list of slot cell lists.
+
+    Returns, for every slot, a list of (other_slot, pos_in_slot, pos_in_other).
+    """
+    by_cell = {}
+    for i, cells in enumerate(cells_per_slot):
+        for pos, cell in enumerate(cells):
+            by_cell.setdefault(cell, []).append((i, pos))
+    crossings = [[] for _ in cells_per_slot]
+    for owners in by_cell.values():
+        for i, pi in owners:
+            for j, pj in owners:
+                if i != j:
+                    crossings[i].append((j, pi, pj))
+    return crossings
+
+
+def compile_pattern(pattern):
+    """Compile a list of '#'/'.' rows into a shared GridGeometry."""
+    return _compile_pattern(tuple(pattern))
+
+
+@lru_cache(maxsize=None)
+def _compile_pattern(pattern):
+    size = len(pattern)
+    black = frozenset(
+        (r, c) for r, row in enumerate(pattern) for c, ch in enumerate(row) if ch == '#'
+    )
+    slots = []
+    # Horizontal runs, then vertical runs; runs shorter than 3 are not slots
+    for orient in ("horizontal", "vertical"):
+        for a in range(size):
+            start = None
+            for b in range(size + 1):
+                r, c = (a, b) if orient == "horizontal" else (b, a)
+                if b < size and (r, c) not in black:
+                    if start is None:
+                        start = b
+                elif start is not None:
+                    length = b - start
+                    if length >= 3:
+                        if orient == "horizontal":
+                            row, col, step = a, start, 1
+                        else:
+                            row, col, step = start, a, size
+                        first = row * size + col
+                        cells = tuple(first + i * step for i in range(length))
+                        slots.append(Slot(orient, row, col, length, cells, step))
+                    start = None
+    crossings = crossings_of([slot.cells for slot in slots])
+    return GridGeometry(
+        size=size,
+        slots=tuple(slots),
+        lengths=tuple(slot.length for slot in slots),
+        crossings=tuple(tuple(c) for c in crossings),
+        black=black,
+    )
+
+
+class GridState:
+    """
+    Flat bytearray grid of letter codes (0 = empty).
+
+    place() writes a slot's span with one slice assignment. Tentative
+    placements are narrowed and retracted on SlotDomains instead, so the
+    grid only ever receives final words and needs no undo trail.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = bytearray(size * size)
+
+    def place(self, slot, code):
+        """Write the encoded word *code* into *slot*."""
+        self.cells[slot.span] = code
+
+    def known(self, slot):
+        """Number of letters already present in *slot*."""
+        return slot.length - self.cells[slot.span].count(0)
+
+
+# ── Corpus index ─────────────────────────────────────────────────────────────
+
+class WordIndex:
+    """
+    Length-bucketed corpus with one bitset per (length, position, letter).
+
+    Entries keep the order they are given in, answers are lowercased once and
+    answers shorter than 3 letters are dropped (no slot can hold them).
+    """
+
+    def __init__(self, entries):
+        self.entries = {}    # length -> [entry, ...]
+        self.words = {}      # length -> [answer, ...] (lowercase)
+        self.full = {}       # length -> mask of every id
+        self._pos = {}       # (length, pos, letter) -> mask
+        self._same = {}      # (length, answer) -> mask of ids sharing it
+        self.alphabet = {}   # letter -> grid code (1..255)
+        self.letters = [""]  # grid code -> letter
+        for e in entries:
+            word = e.get("answer", "").lower()
+            if len(word) >= 3:
+                self.entries.setdefault(len(word), []).append(e)
+                self.words.setdefault(len(word), []).append(word)
+                for ch in word:
+                    if ch not in self.alphabet:
+                        self.alphabet[ch] = len(self.letters)
+                        self.letters.append(ch)
+
+        same_ids = {}
+        for n, words in self.words.items():
+            self.full[n] = (1 << len(words)) - 1
+            for i, word in enumerate(words):
+                same_ids.setdefault((n, word), []).append(i)
+        for key, ids in same_ids.items():
+            self._same[key] = sum(1 << i for i in ids)
+        self._build_masks()
+        self._letters_at = {}  # (length, pos) -> letters seen there
+        for n, pos, ch in self._pos:
+            self._letters_at.setdefault((n, pos), []).append(ch)
+        self.stats = CorpusStats(
+            {n: len(words) for n, words in self.words.items()},
+            {n: len(set(words)) for n, words in self.words.items()},
+            ((key, m.bit_count()) for key, m in self._pos.items()),
+        )
+
+    def _build_masks(self):
+        # Collect ids first and pack each mask once: OR-ing bit by bit into
+        # a growing int would make the build quadratic in the bucket size.
+        pos_ids = {}
+        for n, words in self.words.items():
+            for i, word in enumerate(words):
+                for pos, ch in enumerate(word):
+                    pos_ids.setdefault((n, pos, ch), []).append(i)
+        for key, ids in pos_ids.items():
+            self._pos[key] = _pack(ids, len(self.words[key[0]]))
+
+    def size(self, length):
+        """Number of entries of *length*."""
+        return len(self.entries.get(length, ()))
+
+    def mask(self, length, pos, letter):
+        """Ids of *length* having *letter* at *pos*."""
+        return self._pos.get((length, pos, letter), 0)
+
+    def word_mask(self, length, word):
+        """Ids of *length* whose answer is *word* (duplicates share a mask)."""
+        return self._same.get((length, word), 0)
+
+    def letter_counts(self, length, pos, domain):
+        """{letter: number of ids in *domain* with that letter at *pos*}."""
+        counts = {}
+        for ch in self._letters_at.get((length, pos), ()):
+            c = (domain & self._pos[(length, pos, ch)]).bit_count()
+            if c:
+                counts[ch] = c
+        return counts
+
+    def entry(self, length, i):
+        return self.entries[length][i]
+
+    def encode(self, word):
+        """Grid bytes for *word* (see GridState)."""
+        return bytes(self.alphabet[ch] for ch in word)
+
+    def decode(self, code):
+        return "".join(self.letters[b] for b in code)
+
+    def word(self, length, i):
+        return self.words[length][i]
+
+
+class NumpyWordIndex(WordIndex):
+    """
+    WordIndex backed by one uint8 letter-code matrix per answer length.
+
+    Masks are built with vectorised column comparisons and the per-letter
+    counts used for value ordering come from one bincount over the domain;
+    everything else (domain narrowing, MRV counts) stays on the same int
+    bitsets as the pure-Python index, where an AND and a popcount already
+    cost less than a round trip through NumPy, so a given seed produces
+    the same grid with either backend.
+    """
+
+    def _build_masks(self):
+        self.matrix = {}  # length -> uint8 array (entries x length)
+        for n, words in self.words.items():
+            codes = b"".join(self.encode(w) for w in words)
+            matrix = np.frombuffer(codes, dtype=np.uint8).reshape(len(words), n)
+            self.matrix[n] = matrix
+            for pos in range(n):
+                column = matrix[:, pos]
+                for code in np.unique(column):
+                    self._pos[(n, pos, self.letters[code])] = _from_bools(column == code)
+
+    def letter_counts(self, length, pos, domain):
+        matrix = self.matrix.get(length)
+        if matrix is None or not domain:
+            return {}
+        codes = matrix[_to_bools(domain, len(matrix)), pos]
+        counts = np.bincount(codes, minlength=len(self.letters))
+        return {self.letters[c]: int(counts[c]) for c in np.flatnonzero(counts)}
+
+
+def _from_bools(flags):
+    return int.from_bytes(np.packbits(flags, bitorder="little").tobytes(), "little")
+
+
+def _to_bools(mask, size):
+    raw = np.frombuffer(mask.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder="little")[:size].astype(bool)
+
+
+BACKENDS = {"python": WordIndex, "numpy": NumpyWordIndex}
+
+
+def make_index(entries, backend="python"):
+    """
+    Build the corpus index with the named backend.
+
+    "numpy" falls back to the pure-Python index when NumPy is not installed.
+    """
+    if backend == "numpy" and np is None:
+        backend = "python"
+    return BACKENDS.get(backend, WordIndex)(entries)
+
+
+# ── Compiled corpus ──────────────────────────────────────────────────────────
+#
+# Binary layout (little-endian), written by compile_corpus():
+#
+#   header   magic "XWC1", u16 version, u16 letter-table bytes, u32 buckets
+#   letters  UTF-8 string, one character per grid code 1..n
+#   bucket directory, one _BUCKET record per answer length:
+#            length, word count, mask count, then byte offsets of
+#   words    count x length letter codes, rows sorted (one row per answer)
+#   clues    (count + 1) u32 offsets into the clue blob; a word's clues are
+#            its slice of the blob, joined by CLUE_SEP
+#   keys     per (position, code) mask: u8 pos, u8 code, u32 popcount
+#   masks    one (count + 7) // 8 byte bitset per key, in key order
+
+CORPUS_MAGIC = b"XWC1"
+CORPUS_VERSION = 1
+CLUE_SEP = "\x1f"
+_HEADER = struct.Struct("<4sHHI")
+_BUCKET = struct.Struct("<IIIQQQQ")
+_KEY = struct.Struct("<BBI")
+_OFFSET = struct.Struct("<I")
+
+
+def iter_entries(path, chunk_size=1 << 16):
+    """
+    Yield the entries of a JSON array corpus file one at a time.
+
+    The file is decoded chunk by chunk, so memory holds a chunk and the
+    entry being parsed instead of the whole document. Each entry comes out
+    normalised as {"clue", "answer"} (stripped, answer lowercased); items
+    without a non-empty string clue and answer are skipped. Raises
+    ValueError if the file is not a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def refill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+
+        def peek():
+            # Next non-blank character, "" at end of file
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return buf[pos:pos + 1]
+                refill()
+
+        if peek() != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+        if peek() == "]":
+            return
+        while True:
+            peek()
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if eof:
+                        raise
+                    refill()
+                    continue
+                if eof or not _may_continue(item, buf, end):
+                    break
+                refill()  # a number may continue in the next chunk
+            pos = end
+            if isinstance(item, dict):
+                clue, answer = item.get("clue"), item.get("answer")
+                if isinstance(clue, str) and isinstance(answer, str) and clue.strip() and answer.strip():
+                    yield {"clue": clue.strip(), "answer": answer.strip().lower()}
+            sep = peek()
+            if sep == "]":
+                return
+            if sep != ",":
+                raise ValueError(f"{path}: expected ',' or ']' in the entry array")
+            pos += 1
+
+
+def _may_continue(item, buf, end):
+    """Whether a value decoded up to buf[end] could be cut short by the chunk end."""
+    if end >= len(buf):
+        return True
+    # "2." or "2.5e" at the end of a chunk decode as 2 and 2.5
+    is_number = isinstance(item, (int, float)) and not isinstance(item, bool)
+    return is_number and buf[end] in ".eE"
+
+
+def compile_corpus(entries, path):
+    """
+    Write *entries* to *path* in the compiled corpus format.
+
+    *entries* is consumed once (iter_entries() can stream it). Answers are
+    lowercased and deduplicated (a repeated answer keeps all of its distinct
+    clues); answers shorter than 3 letters are dropped. Nothing is written
+    if no entry is usable, otherwise the file is written next to *path* and
+    moved into place, so readers never see a partial corpus. Returns the
+    number of distinct answers written.
+    """
+    by_length = {}  # length -> {answer: [clue, ...]}
+    for e in entries:
+        word = str(e.get("answer", "")).strip().lower()
+        clue = str(e.get("clue", "")).replace(CLUE_SEP, " ").strip()
+        if len(word) >= 3 and clue:
+            known = by_length.setdefault(len(word), {}).setdefault(word, [])
+            if clue not in known:
+                known.append(clue)
+    if not by_length:
+        raise ValueError("corpus has no usable entries")
+
+    letters = sorted({ch for clues in by_length.values() for word in clues for ch in word})
+    if len(letters) > 255:
+        raise ValueError("corpus uses more than 255 distinct letters")
+    alphabet = {ch: i for i, ch in enumerate(letters, 1)}
+    buckets = {
+        n: [bytes(alphabet[ch] for ch in word) for word in clues]
+        for n, clues in by_length.items()
+    }
+
+    letter_bytes = "".join(letters).encode("utf-8")
+    n_buckets = len(buckets)
+    offset = _HEADER.size + len(letter_bytes) + _BUCKET.size * n_buckets
+    directory, sections = [], []
+    total = 0
+    for n in sorted(buckets):
+        # Buckets are dropped as they are encoded to keep the peak down
+        codes = sorted(buckets.pop(n))
+        clues = by_length.pop(n)
+        count = len(codes)
+        total += count
+        pos_ids = {}
+        for i, code in enumerate(codes):
+            for pos, c in enumerate(code):
+                pos_ids.setdefault((pos, c), []).append(i)
+        keys = sorted(pos_ids)
+
+        blob = bytearray()
+        index = [0]
+        for code in codes:
+            word = "".join(letters[c - 1] for c in code)
+            blob += CLUE_SEP.join(clues[word]).encode("utf-8")
+            index.append(len(blob))
+        words = b"".join(codes)
+        clue_index = b"".join(_OFFSET.pack(o) for o in index)
+        key_table = b"".join(_KEY.pack(pos, c, len(pos_ids[(pos, c)])) for pos, c in keys)
+        masks = b"".join(_pack(pos_ids[key], count).to_bytes((count + 7) // 8, "little")
+                         for key in keys)
+
+        words_off = offset
+        clues_off = words_off + len(words)
+        blob_off = clues_off + len(clue_index)
+        keys_off = blob_off + len(blob)
+        offset = keys_off + len(key_table) + len(masks)
+        directory.append(_BUCKET.pack(n, count, len(keys), words_off, clues_off, blob_off, keys_off))
+        sections += [words, clue_index, bytes(blob), key_table, masks]
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, len(letter_bytes), n_buckets))
+        f.write(letter_bytes)
+        f.writelines(directory)
+        f.writelines(sections)
+    os.replace(tmp, path)
+    return total
+
+
+class _MaskTable(dict):
+    """(length, pos, letter) -> mask, read from the corpus file on first use."""
+
+    def __init__(self, index):
+        super().__init__()
+        self._index = index
+
+    def __missing__(self, key):
+        where = self._index._mask_at.get(key)
+        if where is None:
+            raise KeyError(key)
+        start, end = where
+        mask = self[key] = int.from_bytes(self._index._mm[start:end], "little")
+        return mask
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+class CompiledIndex(WordIndex):
+    """
+    WordIndex over a memory-mapped compiled corpus (see compile_corpus).
+
+    Opening one reads only the header and the per-bucket directories; words,
+    clues and masks are decoded from the mapping when first asked for, so
+    the cost of loading does not grow with the corpus and worker processes
+    that map the same file share its pages. Ids follow the file's sorted
+    answer order and entries carry every clue of their answer in "clues".
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        magic, version, letter_len, n_buckets = _HEADER.unpack_from(mm, 0)
+        if magic != CORPUS_MAGIC or version != CORPUS_VERSION:
+            raise ValueError(f"{path} is not a version {CORPUS_VERSION} compiled corpus")
+        at = _HEADER.size
+        self.letters = [""] + list(mm[at:at + letter_len].decode("utf-8"))
+        self.alphabet = {ch: i for i, ch in enumerate(self.letters) if ch}
+        at += letter_len
+
+        self._buckets = {}   # length -> (count, words_off, clues_off, blob_off)
+        self._mask_at = {}   # (length, pos, letter) -> (start, end) in the file
+        self._letters_at = {}
+        self.full = {}
+        self._pos = _MaskTable(self)
+        self._same = {}      # (length, answer) -> mask, filled as answers are looked up
+        self._decoded = {}   # (length, id) -> answer, likewise
+        counts, totals = {}, []
+        for _ in range(n_buckets):
+            n, count, n_keys, words_off, clues_off, blob_off, keys_off = _BUCKET.unpack_from(mm, at)
+            at += _BUCKET.size
+            self._buckets[n] = (count, words_off, clues_off, blob_off)
+            self.full[n] = (1 << count) - 1
+            counts[n] = count
+            nbytes = (count + 7) // 8
+            start = keys_off + n_keys * _KEY.size
+            for k, (pos, code, total) in enumerate(_KEY.iter_unpack(mm[keys_off:start])):
+                ch = self.letters[code]
+                self._mask_at[(n, pos, ch)] = (start + k * nbytes, start + (k + 1) * nbytes)
+                self._letters_at.setdefault((n, pos), []).append(ch)
+                totals.append(((n, pos, ch), total))
+        # Answers are unique in a compiled corpus
+        self.stats = CorpusStats(counts, dict(counts), totals)
+
+    def __reduce__(self):
+        # Pool workers reopen the file instead of receiving a copy of it
+        return type(self), (self.path,)
+
+    def size(self, length):
+        bucket = self._buckets.get(length)
+        return bucket[0] if bucket else 0
+
+    def _code(self, length, i):
+        words_off = self._buckets[length][1]
+        return self._mm[words_off + i * length:words_off + (i + 1) * length]
+
+    def mask(self, length, pos, letter):
+        try:
+            return self._pos[(length, pos, letter)]
+        except KeyError:
+            return 0
+
+    def word(self, length, i):
+        word = self._decoded.get((length, i))
+        if word is None:
+            word = self._decoded[(length, i)] = self.decode(self._code(length, i))
+        return word
+
+    def clues(self, length, i):
+        _, _, clues_off, blob_off = self._buckets[length]
+        start, end = struct.unpack_from("<II", self._mm, clues_off + i * _OFFSET.size)
+        return self._mm[blob_off + start:blob_off + end].decode("utf-8").split(CLUE_SEP)
+
+    def entry(self, length, i):
+        clues = self.clues(length, i)
+        return {"clue": clues[0], "answer": self.word(length, i), "clues": clues}
+
+    def word_mask(self, length, word):
+        mask = self._same.get((length, word))
+        if mask is None:
+            mask = self._same[(length, word)] = self._find(length, word)
+        return mask
+
+    def _find(self, length, word):
+        # Rows are sorted, so the answer's id is found by bisection
+        bucket = self._buckets.get(length)
+        if bucket is None or len(word) != length:
+            return 0
+        try:
+            code = self.encode(word)
+        except KeyError:
+            return 0
+        lo, hi = 0, bucket[0]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._code(length, mid) < code:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < bucket[0] and self._code(length, lo) == code:
+            return 1 << lo
+        return 0
+
+
+class CompiledNumpyIndex(CompiledIndex, NumpyWordIndex):
+    """CompiledIndex with the NumPy letter matrices, viewing the mapping."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.matrix = {
+            n: np.frombuffer(self._mm, dtype=np.uint8, count=count * n, offset=words_off).reshape(count, n)
+            for n, (count, words_off, _, _) in self._buckets.items()
+        }
+
+
+def load_compiled(path, backend="python"):
+    """Open a compiled corpus with the named backend (see make_index)."""
+    if backend == "numpy" and np is not None:
+        return CompiledNumpyIndex(path)
+    return CompiledIndex(path)
+
+
+# ── Feasibility analysis ─────────────────────────────────────────────────────
+
+class CorpusStats:
+    """
+    Per-length word counts and letter-position frequencies of an index.
+
+    distinct[n] counts different answers of length n (a grid never repeats
+    one); freq[(n, pos)] maps letter -> share of length-n words with that
+    letter at pos.
+    """
+
+    def __init__(self, counts, distinct, letter_totals):
+        self.counts = counts
+        self.distinct = distinct
+        self.freq = {}
+        for (n, pos, ch), c in letter_totals:
+            self.freq.setdefault((n, pos), {})[ch] = c / counts[n]
+
+
+def analyse_pattern(geometry, stats):
+    """
+    Estimate how fillable *geometry* is with a corpus.
+
+    Returns (plausible, log_fills, shortfall): shortfall maps each length to
+    how many more distinct answers its slots need than the corpus has;
+    log_fills is the log10 of the expected number of complete fills when
+    every slot draws a word at random and each crossing must agree, the
+    usual first-moment estimate.  A pattern is plausible when nothing falls
+    short and at least one fill is expected.
+    """
+    needed = {}
+    for n in geometry.lengths:
+        needed[n] = needed.get(n, 0) + 1
+    shortfall = {n: k - stats.distinct.get(n, 0) for n, k in needed.items()
+                 if k > stats.distinct.get(n, 0)}
+
+    log_fills = 0.0
+    for n in geometry.lengths:
+        log_fills += math.log10(stats.counts[n]) if stats.counts.get(n) else -math.inf
+    for i, row in enumerate(geometry.crossings):
+        for j, pos, opos in row:
+            if j < i:
+                continue  # each crossing once
+            a = stats.freq.get((geometry.lengths[i], pos), {})
+            b = stats.freq.get((geometry.lengths[j], opos), {})
+            agree = sum(p * b.get(ch, 0.0) for ch, p in a.items())
+            log_fills += math.log10(agree) if agree else -math.inf
+    return not shortfall and log_fills >= 0, log_fills, shortfall
+
+
+def rank_patterns(geometries, stats):
+    """
+    Order pattern indexes from most to least fillable.
+
+    Returns (ranked, plausible): every index sorted by plausibility and
+    estimated fills, and the subset worth searching for a complete grid.
+    """
+    scored = [(analyse_pattern(g, stats), i) for i, g in enumerate(geometries)]
+    scored.sort(key=lambda x: (not x[0][0], -x[0][1], x[1]))
+    ranked = [i for _, i in scored]
+    plausible = [i for (ok, _, _), i in scored if ok]
+    return ranked, plausible
+
+
+# ── Pattern synthesis ────────────────────────────────────────────────────────
+# Patterns are 180° rotationally symmetric, every horizontal and vertical run
+# of white cells is 0 or >= 3 long, and all white cells are connected.
+
+def _run_spans(line):
+    """(start, length) of the white runs in a sequence of black flags."""
+    spans = []
+    start = None
+    for i, is_black in enumerate(list(line) + [True]):
+        if is_black:
+            if start is not None:
+                spans.append((start, i - start))
+            start = None
+        elif start is None:
+            start = i
+    return spans
+
+
+def _runs(line):
+    return [n for _, n in _run_spans(line)]
+
+
+def _connected(black):
+    size = len(black)
+    whites = [(r, c) for r in range(size) for c in range(size) if not black[r][c]]
+    if not whites:
+        return False
+    seen = {whites[0]}
+    stack = [whites[0]]
+    while stack:
+        r, c = stack.pop()
+        for nr, nc in ((r + 1, c), (r - 1, c), (r, c + 1), (r, c - 1)):
+            if 0 <= nr < size and 0 <= nc < size and not black[nr][nc] and (nr, nc) not in seen:
+                seen.add((nr, nc))
+                stack.append((nr, nc))
+    return len(seen) == len(whites)
+
+
+def validate_pattern(pattern, size=None):
+    """True when *pattern* is square (of *size*), symmetric, connected and has no 1-2 runs."""
+    n = len(pattern)
+    if not n or (size is not None and n != size):
+        return False
+    if any(len(row) != n or set(row) - {"#", "."} for row in pattern):
+        return False
+    black = [[ch == "#" for ch in row] for row in pattern]
+    if any(black[r][c] != black[n - 1 - r][n - 1 - c] for r in range(n) for c in range(n)):
+        return False
+    lines = black + [list(col) for col in zip(*black)]
+    if any(run < 3 for line in lines for run in _runs(line)):
+        return False
+    return _connected(black)
+
+
+def generate_pattern(size, rnd, max_len=None, black_ratio=0.17, attempts=2000):
+    """
+    Random valid pattern of *size*, or None if the attempts run out.
+
+    Black cells are added in symmetric pairs, first to split runs longer than
+    *max_len* into runs of at least 3, then anywhere until *black_ratio* of
+    the grid is black.  A grid that stops accepting cells starts over.
+    """
+    max_len = max_len or size
+    target = int(size * size * black_ratio)
+    black = [[False] * size for _ in range(size)]
+    count = 0
+    stuck = 0
+    for _ in range(attempts):
+        if stuck > 4 * size:
+            black = [[False] * size for _ in range(size)]
+            count = 0
+            stuck = 0
+        cuts = []
+        for r in range(size):
+            for start, n in _run_spans(black[r]):
+                if n > max_len:
+                    cuts.extend((r, start + k) for k in range(3, n - 3))
+        for c in range(size):
+            for start, n in _run_spans(row[c] for row in black):
+                if n > max_len:
+                    cuts.extend((start + k, c) for k in range(3, n - 3))
+        if not cuts and count >= target:
+            return ["".join("#" if b else "." for b in row) for row in black]
+        r, c = rnd.choice(cuts) if cuts else (rnd.randrange(size), rnd.randrange(size))
+        stuck += 1
+        if black[r][c]:
+            continue
+        pr, pc = size - 1 - r, size - 1 - c
+        black[r][c] = black[pr][pc] = True
+        lines = [black[r], black[pr], [row[c] for row in black], [row[pc] for row in black]]
+        if all(n >= 3 for line in lines for n in _runs(line)) and _connected(black):
+            count += 1 if (r, c) == (pr, pc) else 2
+            stuck = 0
+        else:
+            black[r][c] = black[pr][pc] = False
+    return None
+
+
+def estimate_fillability(geometry, index, rnd, samples=20):
+    """
+    Sample greedy MRV fills of *geometry*.
+
+    Returns (complete_rate, mean_ratio): the share of samples that filled
+    every slot and the mean share of slots filled.
+    """
+    n = len(geometry.slots)
+    complete = 0
+    total = 0
+    for _ in range(samples):
+        filled = len(_refill(geometry.lengths, geometry.crossings, index, rnd, {}, range(n)))
+        complete += filled == n
+        total += filled
+    return complete / samples, total / (samples * n)
+
+
+# ── Constraint solver ────────────────────────────────────────────────────────
+# Slots are variables, corpus ids of the slot length are values.  Search uses
+# MRV slot ordering, least-constraining-value ordering with forward checking,
+# conflict-directed backjumping and a cache of small nogoods.  Each answer may
+# appear only once in the grid.
+
+SOLVED = "solved"
+INFEASIBLE = "infeasible"
+LIMIT = "limit"
+
+_MAX_NOGOOD = 6
+
+
+class SlotDomains:
+    """
+    Live candidate bitset per slot, narrowed incrementally as words are placed.
+
+    place() ANDs each crossing slot's domain with the mask of the letter it
+    receives and logs the previous value on a trail; undo() pops the trail
+    back to a mark().  Used answers are excluded at query time, so a lookup
+    is a single AND + popcount instead of a rescan of the grid.
+    """
+
+    def __init__(self, lengths, crossings, index):
+        self.lengths = lengths
+        self.crossings = crossings
+        self.index = index
+        self.domains = [index.full.get(n, 0) for n in lengths]
+        self.trail = []  # (slot, previous mask)
+
+    def mark(self):
+        return len(self.trail)
+
+    def undo(self, mark):
+        trail = self.trail
+        domains = self.domains
+        while len(trail) > mark:
+            slot, prev = trail.pop()
+            domains[slot] = prev
+
+    def place(self, slot, word):
+        """Narrow the slots crossing *slot* to the letters of *word*."""
+        domains = self.domains
+        for other, pos, opos in self.crossings[slot]:
+            prev = domains[other]
+            new = prev & self.index.mask(self.lengths[other], opos, word[pos])
+            if new != prev:
+                self.trail.append((other, prev))
+                domains[other] = new
+
+    def live(self, slot, used):
+        """Candidate ids of *slot* minus the *used* bitset of its length."""
+        return self.domains[slot] & ~used
+
+    def count(self, slot, used):
+        return (self.domains[slot] & ~used).bit_count()
+
+
+class _Budget(Exception):
+    pass
+
+
+class _Solver:
+    def __init__(self, lengths, crossings, index, rnd, max_nodes, deadline, fixed, variables):
+        self.lengths = lengths
+        self.crossings = crossings
+        self.index = index
+        self.rnd = rnd
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.nodes = 0
+        self.counts = Counter()  # work counters, see solve()
+        self.assigned = {}     # slot -> word id
+        self.words = {}        # slot -> answer
+        self.used = {}         # length -> bitset of used ids
+        self.domains = SlotDomains(lengths, crossings, index)
+        self.marks = {}        # slot -> trail mark before its placement
+        self.same_length = {}  # length -> [slot, ...]
+        self.nogoods = {}      # (slot, id) -> [frozenset of (slot, id)]
+        self.best = {}
+        for i, n in enumerate(lengths):
+            self.same_length.setdefault(n, []).append(i)
+        self.variables = range(len(lengths)) if variables is None else sorted(variables)
+        self.var_set = set(self.variables)
+        self.todo = len(self.var_set)  # variables still unassigned
+        for slot, wid in (fixed or {}).items():
+            self._assign(slot, wid)
+
+    def run(self):
+        try:
+            conflict = self._search()
+        except _Budget:
+            return LIMIT, dict(self.best), self.nodes
+        if conflict is None:
+            return SOLVED, dict(self.assigned), self.nodes
+        return INFEASIBLE, dict(self.best), self.nodes
+
+    # -- state --------------------------------------------------------------
+
+    def _assign(self, slot, wid):
+        n = self.lengths[slot]
+        word = self.index.word(n, wid)
+        self.assigned[slot] = wid
+        self.words[slot] = word
+        self.marks[slot] = self.domains.mark()
+        self.domains.place(slot, word)
+        if slot in self.var_set:
+            self.todo -= 1
+        self.used[n] = self.used.get(n, 0) | self.index.word_mask(n, word)
+        if len(self.assigned) > len(self.best):
+            self.best = dict(self.assigned)
+
+    def _unassign(self, slot):
+        n = self.lengths[slot]
+        word = self.words.pop(slot)
+        del self.assigned[slot]
+        if slot in self.var_set:
+            self.todo += 1
+        self.domains.undo(self.marks.pop(slot))
+        self.used[n] &= ~self.index.word_mask(n, word)
+
+    def _domain(self, slot):
+        return self.domains.live(slot, self.used.get(self.lengths[slot], 0))
+
+    def _conflicts(self, slot):
+        """Assigned slots that can have narrowed the domain of *slot*."""
+        conf = {o for o, _, _ in self.crossings[slot] if o in self.assigned}
+        conf.update(o for o in self.same_length[self.lengths[slot]] if o in self.assigned)
+        return conf
+
+    # -- search -------------------------------------------------------------
+
+    def _select(self):
+        """Most constrained unassigned slot (MRV, ties by degree)."""
+        best = None
+        for slot in self.variables:
+            if slot in self.assigned:
+                continue
+            dom = self._domain(slot)
+            size = dom.bit_count()
+            if size == 0:
+                return slot, 0
+            degree = sum(1 for o, _, _ in self.crossings[slot] if o not in self.assigned)
+            key = (size, -degree)
+            if best is None or key < best[0]:
+                best = (key, slot, dom)
+        return best[1], best[2]
+
+    def _order(self, slot, dom, conf):
+        """
+        Candidate ids for *slot*, least constraining first.
+
+        A value that leaves a crossing slot without candidates is dropped and
+        the assignments behind that wipe-out join *conf*.
+        """
+        n = self.lengths[slot]
+        checks = []
+        for other, pos, opos in self.crossings[slot]:
+            if other in self.assigned or other not in self.var_set:
+                continue
+            on = self.lengths[other]
+            counts = self.index.letter_counts(on, opos, self._domain(other))
+            checks.append((pos, counts, other))
+        ids = list(iter_bits(dom))
+        self.rnd.shuffle(ids)
+        scored = []
+        tested = 0
+        for wid in ids:
+            word = self.index.word(n, wid)
+            score = 1
+            for pos, counts, other in checks:
+                tested += 1
+                c = counts.get(word[pos], 0)
+                if c == 0:
+                    conf |= self._conflicts(other)
+                    score = 0
+                    break
+                score *= c
+            if score:
+                scored.append((score, wid))
+        self.counts["candidates"] += len(ids)
+        self.counts["forward_checks"] += tested
+        self.counts["rollbacks"] += len(ids) - len(scored)
+        scored.sort(key=lambda x: -x[0])
+        return [wid for _, wid in scored]
+
+    def _nogood_hit(self, slot, wid):
+        """Return the other slots of a cached nogood matched by this value."""
+        for nogood in self.nogoods.get((slot, wid), ()):
+            if all(self.assigned.get(s) == w for s, w in nogood if s != slot):
+                return {s for s, _ in nogood if s != slot}
+        return None
+
+    def _record_nogood(self, conf):
+        if not conf or len(conf) > _MAX_NOGOOD:
+            return
+        nogood = frozenset((s, self.assigned[s]) for s in conf)
+        for pair in nogood:
+            self.nogoods.setdefault(pair, []).append(nogood)
+
+    def _search(self):
+        """Return None once every variable is filled, else the conflict set."""
+        if self.todo == 0:
+            return None
+        slot, dom = self._select()
+        conf = self._conflicts(slot)
+        if not dom:
+            self.counts["wipeouts"] += 1
+            return conf
+        for wid in self._order(slot, dom, conf):
+            self.nodes += 1
+            if self.nodes > self.max_nodes:
+                raise _Budget
+            if self.deadline is not None and not self.nodes % 64 and time.monotonic() > self.deadline:
+                raise _Budget
+            hit = self._nogood_hit(slot, wid)
+            if hit is not None:
+                conf |= hit
+                continue
+            self.counts["placements"] += 1
+            self._assign(slot, wid)
+            result = self._search()
+            if result is None:
+                return None
+            self.counts["unassigns"] += 1
+            self._unassign(slot)
+            if slot not in result:
+                # Backjump: this slot's value played no part in the failure
+                self.counts["backjumps"] += 1
+                return result
+            result.discard(slot)
+            conf |= result
+        self._record_nogood(conf)
+        return conf
+
+
+def solve(lengths, crossings, index, rnd, max_nodes=20000, deadline=None,
+          fixed=None, variables=None, counts=None):
+    """
+    Fill every slot or prove it impossible with this corpus.
+
+    *lengths* gives each slot's length and *crossings* comes from
+    crossings_of().  Returns (status, assignment, nodes) where assignment maps
+    slot -> word id; for INFEASIBLE and LIMIT it is the deepest partial
+    assignment reached.  LIMIT means *max_nodes* or the time.monotonic()
+    *deadline* ran out first.
+
+    *fixed* pre-assigns {slot: word id} pairs that search never changes, and
+    *variables* limits the slots that must be filled (default: all).
+
+    The work done is added to the *counts* Counter, if given: candidates
+    (values tried), forward_checks, rollbacks (values dropped because a
+    crossing slot lost every candidate), wipeouts (slots reached with an
+    empty domain), placements, unassigns, backjumps and solver_nodes.
+    """
+    solver = _Solver(lengths, crossings, index, rnd, max_nodes, deadline, fixed, variables)
+    try:
+        return solver.run()
+    finally:
+        if counts is not None:
+            solver.counts["solver_nodes"] += solver.nodes
+            counts.update(solver.counts)
+
+
+def place_pinned(geometry, index, rnd, pins, max_nodes=2000):
+    """
+    Choose a slot for every pinned word, or return None if they cannot all fit.
+
+    *pins* is a sequence of (word, position) pairs, position being None or
+    (row, col, orient) of the slot's first cell. Returns {slot: word id},
+    ready for solve(fixed=...). Pins with the fewest possible slots are
+    placed first, each in the slot that leaves its crossing slots the most
+    candidates (ties broken by *rnd*); a placement that agrees with the
+    pins already placed but empties a crossing slot is never tried, so
+    only consistent seeds reach the solver.
+    """
+    slots = geometry.slots
+    domains = SlotDomains(geometry.lengths, geometry.crossings, index)
+    used = {}
+    choices = []
+    for word, position in pins:
+        n = len(word)
+        same = index.word_mask(n, word)
+        if not same:
+            return None
+        wid = (same & -same).bit_length() - 1
+        cands = [
+            i for i, slot in enumerate(slots)
+            if slot.length == n and (position is None or (slot.row, slot.col, slot.orient) == tuple(position))
+        ]
+        if not cands:
+            return None
+        choices.append((len(cands), n, word, wid, cands))
+    choices.sort(key=lambda c: c[0])
+    assigned = {}
+    nodes = 0
+
+    def score(slot, n, word):
+        # Magnitude of the smallest crossing domain left by the placement
+        mark = domains.mark()
+        domains.place(slot, word)
+        worst = None
+        for other, _, _ in geometry.crossings[slot]:
+            if other in assigned:
+                continue
+            count = domains.count(other, used.get(slots[other].length, 0))
+            worst = count if worst is None else min(worst, count)
+        domains.undo(mark)
+        return 0 if worst == 0 else (worst or 1).bit_length()
+
+    def place(k):
+        nonlocal nodes
+        if k == len(choices):
+            return True
+        _, n, word, wid, cands = choices[k]
+        live = [s for s in cands if s not in assigned and (domains.live(s, used.get(n, 0)) >> wid) & 1]
+        rnd.shuffle(live)
+        scored = [(score(s, n, word), s) for s in live]
+        scored.sort(key=lambda x: -x[0])
+        for value, slot in scored:
+            nodes += 1
+            if value == 0 or nodes > max_nodes:
+                return False
+            mark = domains.mark()
+            domains.place(slot, word)
+            assigned[slot] = wid
+            used[n] = used.get(n, 0) | index.word_mask(n, word)
+            if place(k + 1):
+                return True
+            used[n] &= ~index.word_mask(n, word)
+            del assigned[slot]
+            domains.undo(mark)
+        return False
+
+    return assigned if place(0) else None
+
+
+def _refill(lengths, crossings, index, rnd, fixed, variables, tries=30, counts=None):
+    """
+    Greedy MRV fill of *variables* around *fixed*, skipping dead slots.
+
+    Unlike solve() this never fails: slots left without candidates are
+    simply not filled (and counted as wipeouts).  *counts* is as for solve().
+    """
+    counts = Counter() if counts is None else counts
+    domains = SlotDomains(lengths, crossings, index)
+    used = {}
+    assigned = {}
+
+    def place(slot, wid):
+        n = lengths[slot]
+        word = index.word(n, wid)
+        assigned[slot] = wid
+        domains.place(slot, word)
+        used[n] = used.get(n, 0) | index.word_mask(n, word)
+
+    for slot, wid in fixed.items():
+        place(slot, wid)
+    todo = set(variables)
+    while todo:
+        best = None
+        for slot in todo:
+            size = domains.count(slot, used.get(lengths[slot], 0))
+            if size and (best is None or size < best[0]):
+                best = (size, slot)
+        if best is None:
+            counts["wipeouts"] += len(todo)
+            break
+        slot = best[1]
+        todo.discard(slot)
+        n = lengths[slot]
+        cands = sample_bits(domains.live(slot, used.get(n, 0)), tries, rnd, index.size(n))
+        choice = cands[0]
+        for wid in cands:
+            counts["candidates"] += 1
+            mark = domains.mark()
+            domains.place(slot, index.word(n, wid))
+            ok = True
+            for o, _, _ in crossings[slot]:
+                if o in todo:
+                    counts["forward_checks"] += 1
+                    if not domains.count(o, used.get(lengths[o], 0)):
+                        ok = False
+                        break
+            domains.undo(mark)
+            if ok:
+                choice = wid
+                break
+            counts["rollbacks"] += 1
+        counts["placements"] += 1
+        place(slot, choice)
+    return assigned
+
+
+def repair(lengths, crossings, index, rnd, assignment, rounds=100, max_nodes=500, deadline=None,
+           keep=(), counts=None):
+    """
+    Improve a partial fill by large-neighbourhood search.
+
+    Each round frees an empty slot together with the slots crossing it (and
+    their crossers, once small neighbourhoods stop paying off) and refills
+    only that neighbourhood with the rest of the grid fixed: first with the
+    complete solver, then greedily when the neighbourhood cannot be filled
+    entirely.  A round is kept unless fewer slots end up filled, so equal
+    fills still move the search along.  Slots in *keep* (pinned words) are
+    never freed.  Returns the improved assignment; the work of its rounds
+    (repair_rounds) and of their solve()/refill calls is added to *counts*.
+    """
+    counts = Counter() if counts is None else counts
+    current = dict(assignment)
+    radius = 1
+    stale = 0
+    for _ in range(rounds):
+        empty = [s for s in range(len(lengths)) if s not in current]
+        if not empty or (deadline is not None and time.monotonic() > deadline):
+            break
+        hood = {rnd.choice(empty)}
+        for _ in range(radius):
+            hood |= {o for s in hood for o, _, _ in crossings[s]}
+        hood.difference_update(keep)
+        fixed = {s: w for s, w in current.items() if s not in hood}
+        counts["repair_rounds"] += 1
+        status, result, _ = solve(lengths, crossings, index, rnd, max_nodes, deadline,
+                                  fixed=fixed, variables=hood, counts=counts)
+        if status != SOLVED:
+            result = _refill(lengths, crossings, index, rnd, fixed, hood, counts=counts)
+        if len(result) > len(current):
+            current = result
+            stale = 0
+        else:
+            if len(result) == len(current):
+                current = result
+            stale += 1
+            if stale >= 5 and radius < 2:
+                radius += 1
+                stale = 0
+    return current
@@ -0,0 +1,102 @@
+"""
+Generate symmetric crossword patterns and keep the most fillable ones.
+
+Candidates are ranked by sampled greedy fills against the current corpus
+(share of complete fills, then mean share of slots filled) and the best are
+written to the pattern library that web_app loads next to GRID_PATTERNS.
+Only candidates that outscore every built-in pattern of their size are
+kept: anything worse would only add trials that never win.
+
+    python crossword_patterns.py --size 15 --candidates 40 --keep 6
+"""
+import argparse
+import json
+import os
+import random
+
+from crossword_engine import (
+    analyse_pattern, compile_pattern, estimate_fillability, generate_pattern, validate_pattern,
+)
+from web_app import (
+    GRID_PATTERNS, GRID_PATTERNS_LARGE, GRID_PATTERNS_QUICK, PATTERNS_FILE, load_word_index,
+)
+
+BUILT_IN = {15: GRID_PATTERNS, 6: GRID_PATTERNS_QUICK, 21: GRID_PATTERNS_LARGE}
+
+
+def _default_max_len(stats, size, min_words=20):
+    """Longest answer length the corpus has a reasonable supply of."""
+    lengths = [n for n, k in stats.distinct.items() if k >= min_words and n <= size]
+    return max(lengths) if lengths else size
+
+
+def _score(pattern, index, rnd, samples):
+    geometry = compile_pattern(pattern)
+    complete_rate, mean_ratio = estimate_fillability(geometry, index, rnd, samples)
+    _, log_fills, _ = analyse_pattern(geometry, index.stats)
+    return {
+        "pattern": pattern,
+        "slots": len(geometry.slots),
+        "fill_rate": round(complete_rate, 3),
+        "fill_ratio": round(mean_ratio, 3),
+        "log_fills": round(log_fills, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=15)
+    parser.add_argument("--candidates", type=int, default=40, help="patterns to generate")
+    parser.add_argument("--keep", type=int, default=6, help="patterns kept per size")
+    parser.add_argument("--samples", type=int, default=20, help="sampled fills per pattern")
+    parser.add_argument("--max-len", type=int, default=None, help="longest slot (default: from corpus)")
+    parser.add_argument("--black-ratio", type=float, default=0.17)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default=PATTERNS_FILE)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    index = load_word_index()
+    max_len = args.max_len or _default_max_len(index.stats, args.size)
+
+    library = {}
+    if os.path.exists(args.out):
+        with open(args.out, "r", encoding="utf-8") as f:
+            library = json.load(f)
+    key = str(args.size)
+
+    # Patterns already in the library are re-scored against today's corpus
+    scored = [
+        _score(e["pattern"], index, rnd, args.samples)
+        for e in library.get(key, [])
+        if validate_pattern(e.get("pattern", []), args.size)
+    ]
+    seen = {tuple(e["pattern"]) for e in scored}
+    for i in range(args.candidates):
+        pattern = generate_pattern(args.size, rnd, max_len, args.black_ratio)
+        if pattern is None or tuple(pattern) in seen:
+            continue
+        seen.add(tuple(pattern))
+        entry = _score(pattern, index, rnd, args.samples)
+        scored.append(entry)
+        print(f"[{i + 1}/{args.candidates}] {entry['slots']} palabras, "
+              f"completo {entry['fill_rate']:.0%}, relleno {entry['fill_ratio']:.0%}")
+
+    def rank(e):
+        return (e["fill_rate"], e["fill_ratio"], e["log_fills"])
+
+    built_in = [_score(p, index, rnd, args.samples) for p in BUILT_IN.get(args.size, [])]
+    if built_in:
+        floor = max(rank(e) for e in built_in)
+        scored = [e for e in scored if rank(e) > floor and e["pattern"] not in BUILT_IN[args.size]]
+    scored.sort(key=rank, reverse=True)
+    library[key] = scored[:args.keep]
+    tmp = args.out + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(library, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, args.out)
+    print(f"{len(library[key])} patrones de {args.size}x{args.size} guardados en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
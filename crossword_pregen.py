@@ -0,0 +1,81 @@
+"""
+Pre-generate the coming weeks' crosswords into the puzzle store.
+
+Each week is generated in its own worker process and stored under its ISO
+week and the current corpus fingerprint, which is exactly what
+build_daily_crossword looks up (themed weeks included), so those weeks are
+never generated on a request. Weeks already in the store are skipped, and
+a week whose grid runs out of --budget is reported and not stored (the
+same rule as on requests), so a rerun with a larger budget retries it.
+
+    python crossword_pregen.py --weeks 52 --workers 4
+    python crossword_pregen.py --weeks 52 --large
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+import web_app
+
+
+def _init_worker():
+    # One process per week already; no nested trial pools
+    web_app.CROSSWORD_WORKERS = 0
+
+
+def _generate(kind, day, budget):
+    """(week id, fill metadata or None if already stored, whether it was stored)."""
+    index, fingerprint = web_app._corpus.current()
+    week_id = web_app._get_week_id(day)
+    pins = web_app._week_pins(kind, week_id)
+    key = web_app._weekly_key(kind, week_id, fingerprint, pins)
+    if web_app._puzzle_store.get(key) is not None:
+        return week_id, None, True
+    crossword = web_app.generate_weekly_crossword(day, kind, budget, index, fingerprint, pins)
+    if crossword.fill["timed_out"]:
+        return week_id, dict(crossword.fill), False
+    web_app._persist(key, crossword)
+    return week_id, dict(crossword.fill), True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weeks", type=int, default=52, help="weeks to generate, this one included")
+    parser.add_argument("--start", default=None, help="first day (YYYY-MM-DD, default: today in Spain)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--budget", type=float, default=30.0, help="seconds per puzzle")
+    parser.add_argument("--large", action="store_true", help="21x21 crosswords instead of 15x15")
+    args = parser.parse_args()
+
+    kind = "large" if args.large else "weekly"
+    first = date.fromisoformat(args.start) if args.start else datetime.now(web_app.TZ).date()
+    # Any day of a week yields that week's puzzle; use the Mondays
+    first -= timedelta(days=first.weekday())
+    days = [first + timedelta(weeks=k) for k in range(args.weeks)]
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=_init_worker) as pool:
+        futures = [pool.submit(_generate, kind, day, args.budget) for day in days]
+        done = 0
+        failed = []
+        for future in as_completed(futures):
+            (year, week), fill, stored = future.result()
+            done += 1
+            if fill is None:
+                print(f"[{done}/{len(days)}] {year}-W{week:02d} ya estaba generado")
+            elif not stored:
+                failed.append(f"{year}-W{week:02d}")
+                print(f"[{done}/{len(days)}] {year}-W{week:02d} FALLIDO: {fill['filled']}/{fill['slots']} "
+                      f"palabras al agotar {args.budget} s; no se guarda")
+            else:
+                print(f"[{done}/{len(days)}] {year}-W{week:02d} {fill['filled']}/{fill['slots']} "
+                      f"palabras en {fill['elapsed_ms']} ms")
+    print(f"{len(days) - len(failed)} semanas en {web_app.PUZZLE_STORE_DIR}")
+    if failed:
+        print(f"Sin generar ({len(failed)}): {', '.join(sorted(failed))}; repite con más --budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+On-disk store for generated puzzles.
+
+Provides:
+    PuzzleStore(root)     → one compact JSON file per puzzle key
+    store.get(key)        → the stored puzzle, or None
+    store.put(key, data)  → write a puzzle atomically
+    store.prune(keep, n)  → evict puzzles, keeping at most n
+    store.lock(key)       → exclusive lock on a key across threads and processes
+
+A key is a tuple of short strings, e.g. ("weekly", "2026W12", corpus
+fingerprint). The file name is derived from the key itself, so a lookup is
+a single open() however many puzzles the store holds.
+"""
+
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_SAFE_PART = re.compile(r"^[A-Za-z0-9_.]+$")
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            # Locks the first byte; gives up after ~10 s, so keep asking
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class PuzzleStore:
+    def __init__(self, root):
+        self.root = root
+        self._thread_locks = {}  # lock path -> threading.Lock
+        self._guard = threading.Lock()
+
+    def path(self, key):
+        for part in key:
+            if not _SAFE_PART.match(part):
+                raise ValueError(f"invalid puzzle key part: {part!r}")
+        return os.path.join(self.root, "-".join(key) + ".json")
+
+    def get(self, key):
+        """The puzzle stored under *key*, or None (missing or unreadable)."""
+        try:
+            with open(self.path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, puzzle):
+        """
+        Store *puzzle* under *key*.
+
+        The file is written under a temporary name and renamed into place,
+        so a reader sees either the whole puzzle or none.
+        """
+        path = self.path(key)
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(puzzle, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def keys(self):
+        """Keys of every stored puzzle (or lock file)."""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        keys = set()
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext in (".json", ".lock"):
+                keys.add(tuple(stem.split("-")))
+        return list(keys)
+
+    def delete(self, key):
+        path = self.path(key)
+        lock_path = path[:-5] + ".lock"
+        for p in (path, lock_path):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        with self._guard:
+            self._thread_locks.pop(lock_path, None)
+
+    @contextmanager
+    def lock(self, key):
+        """
+        Hold an exclusive lock on *key* across threads and processes.
+
+        Meant for single-flight generation: whoever gets the lock first
+        generates and stores the puzzle, the others wait and then find it
+        in the store. If the lock file cannot be created, only threads of
+        this process are kept apart.
+        """
+        lock_path = self.path(key)[:-5] + ".lock"
+        with self._guard:
+            thread_lock = self._thread_locks.setdefault(lock_path, threading.Lock())
+        with thread_lock:
+            try:
+                os.makedirs(self.root, exist_ok=True)
+                f = open(lock_path, "a+b")
+            except OSError:
+                yield
+                return
+            with f:
+                _lock_file(f)
+                try:
+                    yield
+                finally:
+                    _unlock_file(f)
+
+    def prune(self, keep=None, max_entries=None):
+        """
+        Delete the puzzles whose key fails *keep*(key), then the least
+        recently written ones beyond *max_entries*. Returns how many went.
+        """
+        removed = 0
+        survivors = []
+        for key in self.keys():
+            if keep is not None and not keep(key):
+                self.delete(key)
+                removed += 1
+            else:
+                survivors.append(key)
+        if max_entries is not None and len(survivors) > max_entries:
+            def written(key):
+                try:
+                    return os.path.getmtime(self.path(key))
+                except OSError:
+                    return 0.0
+            survivors.sort(key=written)
+            for key in survivors[:len(survivors) - max_entries]:
+                self.delete(key)
+                removed += 1
+        return removed
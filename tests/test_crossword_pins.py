@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+import web_app
+from crossword_engine import make_index
+
+
+@pytest.fixture(scope="module")
+def index():
+    return make_index(web_app.load_word_entries())
+
+
+def _answers(filled):
+    return {entry["answer"] for _, entry in filled}
+
+
+def test_unplaceable_pins_are_dropped_and_the_rest_kept(index):
+    # 10 letters: no weekly pattern has a slot that long; "zzzz" is not in the corpus
+    pins = web_app._normalise_pins(["silla", "inglaterra", "egipto", "zzzz"])
+    filled, _, _, info = web_app._generate_best("weekly", index, random.Random(1), 1, 2.0, pins=pins)
+
+    assert info["dropped_pins"] == ["inglaterra", "zzzz"]
+    assert info["pinned"] == 2
+    assert {"silla", "egipto"} <= _answers(filled)
+
+
+def test_pins_that_cannot_fit_together_shed_the_longest_first(index):
+    # Both fit the same slot on their own, so only one of them can stay
+    pins = web_app._normalise_pins([
+        ("marte", 0, 0, "horizontal"),
+        ("perro", 0, 0, "horizontal"),
+        "luna",
+    ])
+    kept, dropped = web_app._placeable_pins("weekly", index, pins)
+
+    assert dropped == ["perro"]
+    assert [word for word, _ in kept] == ["luna", "marte"]
+    filled, _, _, info = web_app._generate_best("weekly", index, random.Random(2), 1, 2.0, pins=pins)
+    assert info["dropped_pins"] == ["perro"]
+    assert {"marte", "luna"} <= _answers(filled)
+
+
+def test_no_pins_drop_nothing(index):
+    _, _, _, info = web_app._generate_best("quick", index, random.Random(3), 1, 2.0)
+
+    assert info["dropped_pins"] == []
+    assert info["pinned"] == 0
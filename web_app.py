@@ -1,7 +1,18 @@
 import os
 import json
+import hashlib
+import hmac
+import logging
+import math
 import random
-from collections import deque
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
+from functools import lru_cache
+from types import MappingProxyType
 from datetime import date, datetime
 from zoneinfo import ZoneInfo
 from flask import Flask, session, render_template, request, redirect, url_for, jsonify
@@ -9,6 +20,13 @@ import urllib.request
 import urllib.parse
 import urllib.error
 from sudoku_engine import generate_puzzle as _sudoku_generate
+from puzzle_store import PuzzleStore
+from crossword_engine import (
+    SOLVED, GridState, SlotDomains, compile_corpus, compile_pattern, iter_entries, load_compiled,
+    make_index, place_pinned, rank_patterns, repair, sample_bits, solve, validate_pattern,
+)
+
+_log = logging.getLogger(__name__)
 
 def _load_bot_config():
     try:
@@ -20,6 +38,53 @@ def _load_bot_config():
 _CONFIG = _load_bot_config()
 TZ = ZoneInfo(_CONFIG.get("timezone", "Europe/Madrid"))
 WORDS_FILE = _CONFIG.get("archivos", {}).get("crucigrama", "crucigrama.json")
+PATTERNS_FILE = _CONFIG.get("archivos", {}).get("crucigrama_patrones", "crucigrama_patrones.json")
+# Directory of generated and pre-generated weekly puzzles (see crossword_pregen.py)
+PUZZLE_STORE_DIR = _CONFIG.get("archivos", {}).get("crucigrama_almacen", "crucigramas")
+# Compiled, memory-mapped form of WORDS_FILE (rebuilt when WORDS_FILE is newer)
+COMPILED_WORDS_FILE = _CONFIG.get("archivos", {}).get("crucigrama_compilado", "crucigrama.bin")
+_CROSSWORD_CFG = _CONFIG.get("crucigrama", {})
+# "csp" = complete backtracking solver, "greedy" = single-pass BFS fill
+CROSSWORD_FILL_MODE = _CROSSWORD_CFG.get("modo_relleno", "csp")
+CSP_MAX_NODES = _CROSSWORD_CFG.get("max_nodos", 20000)
+# Corpus index backend: "python" (int bitsets) or "numpy" (vectorised build)
+CROSSWORD_BACKEND = _CROSSWORD_CFG.get("motor", "python")
+# Worker processes for fill trials; 0 or 1 runs them in the request thread
+CROSSWORD_WORKERS = _CROSSWORD_CFG.get("procesos", 0)
+# Neighbourhood-repair rounds run on the best incomplete fill; 0 disables
+CROSSWORD_REPAIR_ROUNDS = _CROSSWORD_CFG.get("rondas_reparacion", 100)
+# Wall-clock cap (seconds) on one crossword generation; None = unbounded
+CROSSWORD_TIME_BUDGET = _CROSSWORD_CFG.get("tiempo_max", 2.0)
+_DEADLINE_GRACE = 0.05
+# Most weekly puzzles kept in the puzzle store (past weeks are always evicted)
+PUZZLE_STORE_SIZE = _CROSSWORD_CFG.get("max_almacen", 200)
+# Part of every stored puzzle's key: bump it whenever a change to the
+# generator or the patterns would produce a different grid for the same
+# week and corpus, so stale stored puzzles stop being served
+CROSSWORD_GENERATOR_VERSION = 1
+# Same for sudoku_engine.generate_puzzle: part of every sudoku's seed key
+SUDOKU_GENERATOR_VERSION = 1
+# Seed-addressed puzzles (quick crosswords, sudokus) kept in memory; any
+# other is rebuilt from its seed on demand
+SEEDED_CACHE_SIZE = _CROSSWORD_CFG.get("cache_semillas", 64)
+# Quick crosswords kept ready by a background thread (0 disables the pool)
+# and the minimum pause between two background generations, in seconds
+QUICK_POOL_SIZE = _CROSSWORD_CFG.get("rapidos_reserva", 8)
+QUICK_POOL_INTERVAL = _CROSSWORD_CFG.get("rapidos_intervalo", 0.1)
+# Admission control for generations done on a request: at most
+# "generadores" run at once and at most "cola_generacion" more wait their
+# turn; anything beyond that is refused with a 503 and Retry-After
+GENERATION_WORKERS = _CROSSWORD_CFG.get("generadores", 2)
+GENERATION_QUEUE = _CROSSWORD_CFG.get("cola_generacion", 8)
+# Themed weeks: ISO week label ("2026W52") -> words the 15x15 weekly
+# crossword must contain, each an answer or {"respuesta", "fila", "columna",
+# "orientacion"} to also fix where it goes (see build_daily_crossword)
+CROSSWORD_THEMES = _CROSSWORD_CFG.get("temas", {})
+# Generation records kept for the admin metrics endpoint
+GENERATION_LOG_SIZE = _CROSSWORD_CFG.get("registro_generaciones", 100)
+# Token the admin endpoints require (?token= or X-Admin-Token); when unset
+# they are disabled, since behind a tunnel or proxy every request looks local
+ADMIN_TOKEN = _CROSSWORD_CFG.get("admin_token")
 
 API_BASE_URL = _CONFIG.get("api", {}).get("base_url", "http://127.0.0.1:8000").rstrip("/")
 
@@ -173,216 +238,888 @@ GRID_PATTERNS_QUICK = [
     ],
 ]
 
-def load_word_entries():
-    if os.path.exists(WORDS_FILE):
+# ---------------------------------------------------------------------------
+# Grid patterns for large crosswords (21x21, 180° rotational symmetry),
+# generated with crossword_patterns.py --size 21; same rules as above
+# ---------------------------------------------------------------------------
+GRID_PATTERNS_LARGE = [
+    [  # Pattern 0: 144 slots, max word length 9
+        ".....##....##...##...",
+        ".....#......#........",
+        ".....#......#........",
+        "####....##....##.....",
+        "...##......#........#",
+        "...#...#.....#.......",
+        ".....#....#.....#....",
+        "........#.......#....",
+        "......#....#......###",
+        "....#......##....#...",
+        ".....#.........#.....",
+        "...#....##......#....",
+        "###......#....#......",
+        "....#.......#........",
+        "....#.....#....#.....",
+        ".......#.....#...#...",
+        "#........#......##...",
+        ".....##....##....####",
+        "........#......#.....",
+        "........#......#.....",
+        "...##...##....##.....",
+    ],
+    [  # Pattern 1: 148 slots, max word length 9
+        "....#......#...#.....",
+        "....#......#.........",
+        "....#......#.........",
+        "........#.....#.....#",
+        ".....#....#......#...",
+        "#........#.....##....",
+        "###...##...###.......",
+        "...#.......#.........",
+        "....##....#...#...###",
+        "....#...##....#......",
+        ".......##...##.......",
+        "......#....##...#....",
+        "###...#...#....##....",
+        ".........#.......#...",
+        ".......###...##...###",
+        "....##.....#........#",
+        "...#......#....#.....",
+        "#.....#.....#........",
+        ".........#......#....",
+        ".........#......#....",
+        ".....#...#......#....",
+    ],
+    [  # Pattern 2: 148 slots, max word length 9
+        "........#...#.......#",
+        "........#...#........",
+        "........#...#........",
+        "...#......#.....##...",
+        "#.....##.....#.......",
+        ".........#....#......",
+        ".....#...#....#...###",
+        "...##......##...##...",
+        "...#....#......#.....",
+        "###....##......#.....",
+        "......#...#...#......",
+        ".....#......##....###",
+        ".....#......#....#...",
+        "...##...##......##...",
+        "###...#....#...#.....",
+        "......#....#.........",
+        ".......#.....##.....#",
+        "...##.....#......#...",
+        "........#...#........",
+        "........#...#........",
+        "#.......#...#........",
+    ],
+    [  # Pattern 3: 148 slots, max word length 9
+        "#...#....#.......#...",
+        ".........#.......#...",
+        ".........#.......#...",
+        "......##.......###...",
+        "...#...#.....#.......",
+        "....#.....#...#......",
+        ".....#....#...#......",
+        "........##......##...",
+        "###...##.....#....###",
+        "...##......##........",
+        ".....#.........#.....",
+        "........##......##...",
+        "###....#.....##...###",
+        "...##......##........",
+        "......#...#....#.....",
+        "......#...#.....#....",
+        ".......#.....#...#...",
+        "...###.......##......",
+        "...#.......#.........",
+        "...#.......#.........",
+        "...#.......#....#...#",
+    ],
+]
+
+
+def load_pattern_library(size):
+    """Extra patterns of *size* from PATTERNS_FILE (written by crossword_patterns.py)."""
+    if not os.path.exists(PATTERNS_FILE):
+        return []
+    try:
+        with open(PATTERNS_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        entries = data.get(str(size), [])
+        return [e["pattern"] for e in entries if validate_pattern(e.get("pattern", []), size)]
+    except Exception:
+        return []
+
+
+# Compiled once at import; every generator shares these
+GRID_GEOMETRIES = [
+    compile_pattern(p)
+    for p in GRID_PATTERNS + [p for p in load_pattern_library(15) if p not in GRID_PATTERNS]
+]
+GRID_GEOMETRIES_QUICK = [
+    compile_pattern(p)
+    for p in GRID_PATTERNS_QUICK + [p for p in load_pattern_library(6) if p not in GRID_PATTERNS_QUICK]
+]
+GRID_GEOMETRIES_LARGE = [
+    compile_pattern(p)
+    for p in GRID_PATTERNS_LARGE + [p for p in load_pattern_library(21) if p not in GRID_PATTERNS_LARGE]
+]
+
+
+def _patterns_fingerprint(geometries):
+    """Short digest of a pattern set, in order (the library can change it)."""
+    shapes = [[g.size, sorted(g.black)] for g in geometries]
+    return hashlib.sha1(json.dumps(shapes).encode("utf-8")).hexdigest()[:8]
+
+
+QUICK_PATTERNS_FINGERPRINT = _patterns_fingerprint(GRID_GEOMETRIES_QUICK)
+
+
+def load_word_entries(path=None):
+    path = path or WORDS_FILE
+    if os.path.exists(path):
         try:
-            with open(WORDS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            valid = [e for e in data if "clue" in e and "answer" in e]
+            valid = list(iter_entries(path))
             if valid:
                 return valid
         except Exception:
             pass
-    return DEFAULT_CROSSWORD_ENTRIES
-
-
-def _extract_slots(pattern):
-    """Extract all horizontal and vertical word slots from a grid pattern."""
-    gs = len(pattern)
-    black = set()
-    for r, row in enumerate(pattern):
-        for c, ch in enumerate(row):
-            if ch == '#':
-                black.add((r, c))
-
-    slots = []
-    # Horizontal slots
-    for r in range(gs):
-        start = None
-        for c in range(gs + 1):
-            if c < gs and (r, c) not in black:
-                if start is None:
-                    start = c
-            else:
-                if start is not None:
-                    length = c - start
-                    if length >= 3:
-                        slots.append({
-                            'orient': 'horizontal',
-                            'row': r, 'col': start, 'length': length,
-                            'cells': [(r, start + i) for i in range(length)],
-                        })
-                    start = None
-    # Vertical slots
-    for c in range(gs):
-        start = None
-        for r in range(gs + 1):
-            if r < gs and (r, c) not in black:
-                if start is None:
-                    start = r
-            else:
-                if start is not None:
-                    length = r - start
-                    if length >= 3:
-                        slots.append({
-                            'orient': 'vertical',
-                            'row': start, 'col': c, 'length': length,
-                            'cells': [(start + i, c) for i in range(length)],
-                        })
-                    start = None
-    return slots, black
-
-
-def _try_fill_slot(slot, by_length, grid, used, rnd):
+    # A copy, so callers can reorder it freely
+    return list(DEFAULT_CROSSWORD_ENTRIES)
+
+
+class CorpusManager:
+    """
+    Crossword corpus index kept in memory and reloaded when its file changes.
+
+    index() never parses on the request path once the first index exists:
+    it compares the file's (mtime, size) with the loaded one and, when they
+    differ, starts a background rebuild. The rebuild hashes the file, does
+    nothing if the content is unchanged, and otherwise compiles and opens
+    the new corpus before swapping it in, so requests keep the old index
+    until the new one is ready. A file that does not parse (say, half
+    written) leaves the current index in place.
+
+    current() also returns the fingerprint of the content behind the index
+    (a short sha256, or "builtin" for the default entries), which keys the
+    puzzles generated from it.
+    """
+
+    def __init__(self, path, compiled_path, backend):
+        self.path = path
+        self.compiled_path = compiled_path
+        self.backend = backend
+        self.reloads = 0
+        self.error = None     # last failed reload, if any
+        self._current = None  # (index, fingerprint), swapped as one
+        self._stamp = None    # (mtime_ns, size) of the file last looked at
+        self._digest = None   # sha256 of that file
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def index(self):
+        return self.current()[0]
+
+    def current(self):
+        """(index, fingerprint) of the corpus in use."""
+        if self._current is None:
+            with self._lock:
+                if self._current is None:
+                    self._stamp, self._digest = self._stat(), self._hash()
+                    self._current = (self._open(), self._fingerprint(self._digest))
+        elif self._stat() != self._stamp:
+            with self._lock:
+                if not self._reloading:
+                    self._reloading = True
+                    threading.Thread(target=self._reload, daemon=True).start()
+        return self._current
+
+    @staticmethod
+    def _fingerprint(digest):
+        return digest[:16] if digest else "builtin"
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _hash(self):
+        digest = hashlib.sha256()
+        try:
+            with open(self.path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 16), b""):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    def _open(self):
+        try:
+            stale = not os.path.exists(self.compiled_path) or (
+                os.path.exists(self.path)
+                and os.path.getmtime(self.path) > os.path.getmtime(self.compiled_path)
+            )
+            if stale:
+                try:
+                    compile_corpus(iter_entries(self.path), self.compiled_path)
+                except (FileNotFoundError, ValueError):
+                    compile_corpus(DEFAULT_CROSSWORD_ENTRIES, self.compiled_path)
+            return load_compiled(self.compiled_path, self.backend)
+        except (OSError, ValueError):
+            return make_index(load_word_entries(self.path), self.backend)
+
+    def _reload(self):
+        stamp, digest = self._stat(), self._hash()
+        try:
+            if digest != self._digest:
+                # Streamed straight into the compiler; a file that fails to
+                # parse raises before the compiled corpus is touched
+                try:
+                    compile_corpus(iter_entries(self.path), self.compiled_path)
+                    index = load_compiled(self.compiled_path, self.backend)
+                except OSError:
+                    index = make_index(iter_entries(self.path), self.backend)
+                self._current = (index, self._fingerprint(digest))
+                self.reloads += 1
+            self.error = None
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            # Recorded even on failure: the next edit changes the stamp again
+            self._stamp, self._digest = stamp, digest
+            self._reloading = False
+
+
+_corpus = CorpusManager(WORDS_FILE, COMPILED_WORDS_FILE, CROSSWORD_BACKEND)
+
+
+def load_word_index():
+    """Corpus index shared by every crossword generated in this process."""
+    return _corpus.index()
+
+
+def _pick_clue(entry, rnd):
+    """One of the entry's clues (compiled corpora keep every clue of an answer)."""
+    clues = entry.get("clues")
+    return rnd.choice(clues) if clues else entry["clue"]
+
+
+def _place_word(slot_idx, slots, wid, index, domains, grid, used):
+    length = slots[slot_idx].length
+    word = index.word(length, wid)
+    grid.place(slots[slot_idx], index.encode(word))
+    domains.place(slot_idx, word)
+    used[length] = used.get(length, 0) | index.word_mask(length, word)
+
+
+def _try_fill_slot(slot_idx, slots, index, domains, grid, used, rnd):
     """Try to fill a single slot with a matching word (no forward checking)."""
-    length = slot['length']
-    cells = slot['cells']
-    constraints = {}
-    for i, (r, c) in enumerate(cells):
-        if grid[r][c] is not None:
-            constraints[i] = grid[r][c]
-
-    candidates = by_length.get(length, [])
-    matching = [
-        e for e in candidates
-        if e["answer"].lower() not in used
-        and all(e["answer"].lower()[pos] == ch for pos, ch in constraints.items())
-    ]
-    if not matching:
+    length = slots[slot_idx].length
+    matching = domains.live(slot_idx, used.get(length, 0))
+    picked = sample_bits(matching, 1, rnd, index.size(length))
+    if not picked:
+        _count("wipeouts")
         return None
-    entry = matching[rnd.randint(0, len(matching) - 1)]
-    word = entry["answer"].lower()
-    for i, (r, c) in enumerate(cells):
-        grid[r][c] = word[i]
-    used.add(word)
-    return entry
+    _count("candidates")
+    _count("placements")
+    _place_word(slot_idx, slots, picked[0], index, domains, grid, used)
+    return picked[0]
 
 
-def _try_fill_slot_fc(slot, by_length, grid, used, rnd, all_slots, cell_to_slots, unfilled_set):
+def _try_fill_slot_fc(slot_idx, slots, index, domains, grid, used, rnd, filled_indices):
     """Try to fill a slot with forward checking on crossing slots."""
-    length = slot['length']
-    cells = slot['cells']
-    constraints = {}
-    for i, (r, c) in enumerate(cells):
-        if grid[r][c] is not None:
-            constraints[i] = grid[r][c]
-
-    candidates = by_length.get(length, [])
-    matching = [
-        e for e in candidates
-        if e["answer"].lower() not in used
-        and all(e["answer"].lower()[pos] == ch for pos, ch in constraints.items())
-    ]
-    rnd.shuffle(matching)
-
-    for entry in matching[:30]:
-        word = entry["answer"].lower()
-        # Tentatively place
-        old_values = {}
-        for i, (r, c) in enumerate(cells):
-            old_values[(r, c)] = grid[r][c]
-            grid[r][c] = word[i]
+    length = slots[slot_idx].length
+    matching = domains.live(slot_idx, used.get(length, 0))
+
+    for i in sample_bits(matching, 30, rnd, index.size(length)):
+        _count("candidates")
+        word = index.word(length, i)
+        # Tentatively narrow the crossing slots
+        mark = domains.mark()
+        domains.place(slot_idx, word)
 
         # Check crossing slots still have candidates
         ok = True
-        for cell in cells:
-            for neighbor_idx in cell_to_slots.get(cell, []):
-                if neighbor_idx not in unfilled_set:
-                    continue
-                if not _has_any_candidate(all_slots[neighbor_idx], by_length, grid, used | {word}):
-                    ok = False
-                    break
-            if not ok:
+        for other, _, _ in domains.crossings[slot_idx]:
+            if other in filled_indices:
+                continue
+            other_length = slots[other].length
+            excluded = used.get(other_length, 0)
+            if other_length == length:
+                excluded |= index.word_mask(length, word)
+            _count("forward_checks")
+            if not domains.live(other, excluded):
+                ok = False
                 break
+        domains.undo(mark)
 
         if ok:
-            used.add(word)
-            return entry
-        else:
-            for (r, c), val in old_values.items():
-                grid[r][c] = val
+            _count("placements")
+            _place_word(slot_idx, slots, i, index, domains, grid, used)
+            return i
+        _count("rollbacks")
 
     return None
 
 
-def _has_any_candidate(slot, by_length, grid, used):
-    """Check if a slot has at least one valid candidate given current grid state."""
-    length = slot['length']
-    constraints = {}
-    for i, (r, c) in enumerate(slot['cells']):
-        if grid[r][c] is not None:
-            constraints[i] = grid[r][c]
-    if not constraints:
-        return True
-    candidates = by_length.get(length, [])
-    for e in candidates:
-        word = e["answer"].lower()
-        if word in used:
-            continue
-        if all(word[pos] == ch for pos, ch in constraints.items()):
-            return True
-    return False
+def _fill_assignment(geometry, index, rnd, mode=None, deadline=None, fixed=None):
+    """
+    Fill a pattern and return {slot index: word id}.
 
+    "csp" runs the complete solver; when it proves the pattern infeasible or
+    runs out of nodes, the greedy fill below provides the best-effort grid.
+    Both stop at *deadline* (time.monotonic()) and keep what they placed.
+    *fixed* (pinned words, from place_pinned) is kept and filled around.
+    """
+    mode = mode or CROSSWORD_FILL_MODE
+    if mode != "csp":
+        return _fill_greedy(geometry, index, rnd, deadline, fixed)
 
-def _fill_grid(slots, entries, rnd, grid_size):
+    status, assignment, _ = solve(geometry.lengths, geometry.crossings, index, rnd,
+                                  CSP_MAX_NODES, deadline, fixed=fixed,
+                                  counts=getattr(_tally, "counts", None))
+    if status != SOLVED:
+        greedy = _fill_greedy(geometry, index, rnd, deadline, fixed)
+        if len(greedy) >= len(assignment):
+            return greedy
+    return assignment
+
+
+def _render_fill(geometry, index, assignment):
+    """(slot, entry) pairs of an assignment, in slot order."""
+    slots = geometry.slots
+    return [(slots[i], index.entry(slots[i].length, assignment[i])) for i in sorted(assignment)]
+
+
+def _fill_greedy(geometry, index, rnd, deadline=None, fixed=None):
     """Fill grid slots using BFS ordering with forward checking."""
-    by_length = {}
-    for e in entries:
-        w = e.get("answer", "")
-        if len(w) >= 3:
-            by_length.setdefault(len(w), []).append(e)
-    for wlist in by_length.values():
-        rnd.shuffle(wlist)
-
-    grid = [[None] * grid_size for _ in range(grid_size)]
-    used = set()
-    filled = []
-    filled_indices = set()
-
-    # Build crossing map: cell -> list of slot indices
-    cell_to_slots = {}
-    for i, slot in enumerate(slots):
-        for cell in slot['cells']:
-            cell_to_slots.setdefault(cell, []).append(i)
-
-    # BFS from the longest slot, spreading to crossing slots
-    remaining = set(range(len(slots)))
-    start = max(remaining, key=lambda i: slots[i]['length'])
+    slots = geometry.slots
+    crossings = geometry.crossings
+    grid = GridState(geometry.size)
+    used = {}  # length -> bitset of used index ids
+    assignment = {}
+
+    domains = SlotDomains(geometry.lengths, crossings, index)
+    for idx, wid in (fixed or {}).items():
+        _place_word(idx, slots, wid, index, domains, grid, used)
+        assignment[idx] = wid
+
+    # BFS from the longest slot (or the one most constrained by fixed
+    # words), spreading to crossing slots
+    remaining = set(range(len(slots))) - set(assignment)
+    if not remaining:
+        return assignment
+    if assignment:
+        start = max(remaining, key=lambda i: grid.known(slots[i]))
+    else:
+        start = max(remaining, key=lambda i: slots[i].length)
     queue = deque([start])
     remaining.discard(start)
 
     while queue or remaining:
+        if deadline is not None and time.monotonic() > deadline:
+            break
         if not queue and remaining:
             # Pick the most constrained remaining slot
-            best = max(remaining, key=lambda i: sum(
-                1 for r, c in slots[i]['cells'] if grid[r][c] is not None
-            ))
+            best = max(remaining, key=lambda i: grid.known(slots[i]))
             queue.append(best)
             remaining.discard(best)
 
         idx = queue.popleft()
-        slot = slots[idx]
 
-        unfilled_set = remaining | {j for j in range(len(slots))
-                                    if j not in filled_indices and j != idx}
-        entry = _try_fill_slot_fc(slot, by_length, grid, used, rnd,
-                                  slots, cell_to_slots, unfilled_set)
+        wid = _try_fill_slot_fc(idx, slots, index, domains, grid, used, rnd, assignment)
+        if wid is None:
+            wid = _try_fill_slot(idx, slots, index, domains, grid, used, rnd)
+
+        if wid is not None:
+            assignment[idx] = wid
+            for neighbor, _, _ in crossings[idx]:
+                if neighbor in remaining:
+                    remaining.discard(neighbor)
+                    queue.append(neighbor)
+
+    return assignment
+
+
+# ---------------------------------------------------------------------------
+# Generation metrics. Fill helpers count their work into the calling
+# thread's tally; each trial starts a fresh one and returns it with its
+# result, so the counts come back from pool workers too. Every generated
+# crossword then produces one record (see _record_generation).
+# ---------------------------------------------------------------------------
+_tally = threading.local()
+_generation_log = deque(maxlen=GENERATION_LOG_SIZE)
+_generation_hooks = []
+_generation_lock = threading.Lock()
+
+
+def _count(name, n=1):
+    counts = getattr(_tally, "counts", None)
+    if counts is not None:
+        counts[name] += n
+
+
+class _Phases(dict):
+    """Phase name -> wall time in ms, each measured from the previous phase."""
+
+    def __init__(self):
+        super().__init__()
+        self._mark = time.monotonic()
+
+    def done(self, name):
+        now = time.monotonic()
+        self[name] = self.get(name, 0) + int((now - self._mark) * 1000)
+        self._mark = now
+
+
+def add_generation_hook(hook):
+    """Call hook(record) after every crossword generation (see _record_generation)."""
+    _generation_hooks.append(hook)
+
+
+def _record_generation(kind, info, fill):
+    """
+    Log the generation record of a crossword and pass it to the hooks.
+
+    The record holds the mode, the "fill" metadata, the summed work
+    counters (candidates, forward_checks, rollbacks, wipeouts, placements,
+    plus unassigns, backjumps, solver_nodes and repair_rounds from the
+    solver and repair; see crossword_engine.solve) with their totals per
+    phase ("trials", "repair"), the number of patterns tried, the index of
+    the pattern used and the wall time of each phase in ms.
+    """
+    record = {
+        "at": datetime.now(TZ).isoformat(timespec="seconds"),
+        "mode": kind,
+        "trials": info["trials"],
+        "patterns": info["patterns"],
+        "pattern": info["pattern"],
+        "counters": info["counters"],
+        "phase_counters": info["phase_counters"],
+        "phases_ms": dict(info["phases"]),
+        "fill": dict(fill),
+    }
+    with _generation_lock:
+        _generation_log.append(record)
+    for hook in list(_generation_hooks):
+        try:
+            hook(record)
+        except Exception:
+            pass
+    return record
+
+
+def generation_metrics():
+    """Recent generation records and their totals per mode."""
+    with _generation_lock:
+        recent = list(_generation_log)
+    totals = {}
+    for record in recent:
+        t = totals.setdefault(record["mode"], {"generations": 0, "complete": 0, "elapsed_ms": 0,
+                                               "counters": Counter()})
+        t["generations"] += 1
+        t["complete"] += record["fill"]["complete"]
+        t["elapsed_ms"] += record["fill"]["elapsed_ms"]
+        t["counters"].update(record["counters"])
+    for t in totals.values():
+        t["counters"] = dict(t["counters"])
+    return {
+        "recent": recent,
+        "totals": totals,
+        "corpus": {"reloads": _corpus.reloads, "error": _corpus.error},
+        "quick_pool": _quick_pool.stats(),
+        "admission": _generation_gate.stats(),
+        "seeded_cache": _seeded_cache.stats(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Trial scheduling: every (pattern, seed, mode) triple is one fill trial.
+# Patterns are ranked against the corpus first; seeds are drawn up front in
+# that order, and the winner is the first trial with the fewest unfilled
+# slots, so sequential and process-pool runs pick the same grid for the
+# same seed.
+# ---------------------------------------------------------------------------
+GEOMETRY_SETS = {
+    "weekly": GRID_GEOMETRIES,
+    "quick": GRID_GEOMETRIES_QUICK,
+    "large": GRID_GEOMETRIES_LARGE,
+}
+
+_pools = []  # [pool, index, generations using it], the newest index last
+_pool_lock = threading.Lock()
+_worker_index = None
+
+
+def _init_trial_worker(index):
+    global _worker_index
+    _worker_index = index
+
+
+def _run_trial(kind, pattern_idx, seed, mode=None, deadline=None, index=None, pins=()):
+    """
+    (assignment, unfilled, counters) of one fill trial.
+
+    The trial's seed also picks the slots of the *pins*; when that fails
+    it takes the placement _pinnable() found, and when that fails too the
+    trial fails with nothing filled rather than fill the grid without them.
+    """
+    geometry = GEOMETRY_SETS[kind][pattern_idx]
+    index = index or _worker_index
+    rnd = random.Random(seed)
+    fixed = None
+    if pins:
+        fixed = (place_pinned(geometry, index, rnd, pins)
+                 or place_pinned(geometry, index, random.Random(pattern_idx), pins))
+        if fixed is None:
+            return {}, len(geometry.slots), {}
+    _tally.counts = Counter()
+    try:
+        assignment = _fill_assignment(geometry, index, rnd, mode, deadline, fixed)
+    finally:
+        counts, _tally.counts = _tally.counts, None
+    return assignment, len(geometry.slots) - len(assignment), dict(counts)
+
+
+@contextmanager
+def _trial_pool(index):
+    """
+    Process pool whose workers hold *index*, for the duration of the block.
+
+    Each index gets its own pool. After a corpus reload the pool of the
+    old index keeps serving the generations already using it and is shut
+    down once the last of them is done, so none sees its trials cancelled.
+    """
+    with _pool_lock:
+        entry = next((e for e in _pools if e[1] is index), None)
         if entry is None:
-            entry = _try_fill_slot(slot, by_length, grid, used, rnd)
+            pool = ProcessPoolExecutor(
+                max_workers=CROSSWORD_WORKERS,
+                initializer=_init_trial_worker,
+                initargs=(index,),
+            )
+            entry = [pool, index, 0]
+            _pools.append(entry)
+        entry[2] += 1
+    try:
+        yield entry[0]
+    finally:
+        with _pool_lock:
+            entry[2] -= 1
+            for old in [e for e in _pools[:-1] if e[2] == 0]:
+                _pools.remove(old)
+                old[0].shutdown(wait=False)
+
+
+def _run_trials_parallel(kind, index, tasks, deadline, pins=()):
+    """
+    Run *tasks* in the process pool and return their results in task order.
+
+    As soon as a trial leaves nothing unfilled, every later trial is
+    cancelled; earlier ones still finish because one of them could win.
+    Trials still pending shortly after *deadline* come back as None.
+    """
+    with _trial_pool(index) as pool:
+        futures = [pool.submit(_run_trial, kind, i, seed, mode, deadline, None, pins)
+                   for i, seed, mode in tasks]
+        return _collect_trials(futures, deadline)
+
+
+def _collect_trials(futures, deadline):
+    stop = len(futures)
+    while True:
+        waiting = [f for f in futures[:stop] if not f.done()]
+        if not waiting:
+            break
+        timeout = None
+        if deadline is not None:
+            # Running trials stop themselves at the deadline; allow them a
+            # moment to hand back what they placed
+            timeout = max(0.0, deadline - time.monotonic()) + _DEADLINE_GRACE
+        done, _ = wait(waiting, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            for f in futures:
+                f.cancel()
+            break
+        for f in done:
+            k = futures.index(f)
+            if k < stop and f.result()[1] == 0:
+                stop = k + 1
+                for later in futures[stop:]:
+                    later.cancel()
+    return [f.result() if f.done() and not f.cancelled() else None for f in futures[:stop]]
+
+
+def _run_trials_sequential(kind, index, tasks, deadline, pins=()):
+    for i, seed, mode in tasks:
+        if deadline is not None and time.monotonic() > deadline:
+            return
+        result = _run_trial(kind, i, seed, mode, deadline, index, pins)
+        yield result
+        if result[1] == 0:
+            return
+
+
+@lru_cache(maxsize=16)
+def _pattern_plan(kind, index):
+    """Ranked pattern indexes of a set and the ones plausibly completable."""
+    return rank_patterns(GEOMETRY_SETS[kind], index.stats)
+
+
+@lru_cache(maxsize=64)
+def _pinnable(kind, index, pins):
+    """Patterns of a set with room for every pinned word (all when none are)."""
+    geometries = GEOMETRY_SETS[kind]
+    if not pins:
+        return frozenset(range(len(geometries)))
+    return frozenset(i for i, g in enumerate(geometries)
+                     if place_pinned(g, index, random.Random(i), pins))
+
+
+def _placeable_pins(kind, index, pins):
+    """
+    (pins, dropped answers): the pins that some pattern of the set can hold.
+
+    Pins the corpus lacks (they have no id, nor a clue) or that no pattern
+    has a slot for are dropped first; then, while no pattern has room for
+    the rest together, the longest of them, one at a time.
+    """
+    slots = {(s.length, (s.row, s.col, s.orient)) for g in GEOMETRY_SETS[kind] for s in g.slots}
+    lengths = {n for n, _ in slots}
+    kept, dropped = [], []
+    for word, position in pins:
+        n = len(word)
+        fits = n in lengths if position is None else (n, tuple(position)) in slots
+        (kept if fits and index.word_mask(n, word) else dropped).append(word)
+    pins = tuple(p for p in pins if p[0] in kept)
+    while pins and not _pinnable(kind, index, pins):
+        longest = max(pins, key=lambda p: (len(p[0]), p[0]))
+        pins = tuple(p for p in pins if p != longest)
+        dropped.append(longest[0])
+    return pins, dropped
+
+
+def _trial_tasks(kind, index, rnd, greedy_trials, pins=()):
+    """
+    (pattern, seed, mode) trials in pattern-rank order.
+
+    When some patterns can plausibly be completed only those are searched,
+    with the configured filler. Otherwise no grid can be complete, so every
+    pattern gets greedy best-effort trials and the exact solver is skipped.
+    With *pins*, only the patterns that can hold them are considered.
+    """
+    ranked, plausible = _pattern_plan(kind, index)
+    if pins:
+        fits = _pinnable(kind, index, pins)
+        ranked = [i for i in ranked if i in fits]
+        plausible = [i for i in plausible if i in fits]
+    if plausible:
+        patterns, mode = plausible, CROSSWORD_FILL_MODE
+    else:
+        patterns, mode = ranked, "greedy"
+    trials = 1 if mode == "csp" else greedy_trials
+    return [(i, rnd.randint(0, 2**31), mode) for i in patterns for _ in range(trials)]
+
+
+def _generate_best(kind, index, rnd, greedy_trials, budget=None, phases=None, pins=()):
+    """
+    Run the fill trials of a pattern set within *budget* seconds (None = no limit).
+
+    The best trial, if incomplete, then goes through local repair. Returns
+    (filled, unfilled, geometry, info), where info records how many trials
+    ran, how many slots repair recovered and whether the budget ran out,
+    plus the work counters and phase timings (added to *phases*, if given)
+    of the generation record. *pins* are words every trial places first
+    and repair leaves alone. Those no pattern can hold are dropped (see
+    _placeable_pins) and logged; info["dropped_pins"] lists them and
+    info["pinned"] says how many pins made it into the grid.
+    """
+    geometries = GEOMETRY_SETS[kind]
+    phases = _Phases() if phases is None else phases
+    pins, dropped = _placeable_pins(kind, index, pins)
+    if dropped:
+        _log.warning("%s crossword: no pattern has room for pinned words %s; dropped",
+                     kind, ", ".join(dropped))
+    tasks = _trial_tasks(kind, index, rnd, greedy_trials, pins)
+    phases.done("plan")
+    deadline = None if budget is None else time.monotonic() + budget
+    if CROSSWORD_WORKERS > 1:
+        results = _run_trials_parallel(kind, index, tasks, deadline, pins)
+    else:
+        results = _run_trials_sequential(kind, index, tasks, deadline, pins)
+
+    best = None  # (assignment, unfilled, pattern index, seed)
+    ran = 0
+    counts = Counter()
+    patterns = set()
+    for (i, seed, _), result in zip(tasks, results):
+        if result is None:
+            continue
+        ran += 1
+        assignment, unfilled, trial_counts = result
+        counts.update(trial_counts)
+        patterns.add(i)
+        if best is None or unfilled < best[1]:
+            best = (assignment, unfilled, i, seed)
+        if unfilled == 0:
+            break
+    if best is None or not best[0]:
+        # Budget spent before any trial placed a word: one greedy fill,
+        # which takes milliseconds, past the deadline rather than an empty grid
+        i, seed, _ = tasks[0]
+        assignment, unfilled, trial_counts = _run_trial(kind, i, seed, "greedy", None, index, pins)
+        ran += 1
+        counts.update(trial_counts)
+        patterns.add(i)
+        best = (assignment, unfilled, i, seed)
+    phases.done("trials")
+
+    assignment, unfilled, i, seed = best
+    geometry = geometries[i]
+    pin_words = {word for word, _ in pins}
+    pinned = {s for s, w in assignment.items() if index.word(geometry.lengths[s], w) in pin_words}
+    repaired = 0
+    repair_counts = Counter()
+    if unfilled and CROSSWORD_REPAIR_ROUNDS:
+        fixed = repair(geometry.lengths, geometry.crossings, index, random.Random(seed),
+                       assignment, CROSSWORD_REPAIR_ROUNDS, deadline=deadline, keep=pinned,
+                       counts=repair_counts)
+        repaired = len(fixed) - len(assignment)
+        assignment = fixed
+        unfilled -= repaired
+    phases.done("repair")
+
+    filled = _render_fill(geometry, index, assignment)
+    phases.done("render")
+    timed_out = deadline is not None and time.monotonic() > deadline and unfilled > 0
+    return filled, unfilled, geometry, {
+        "trials": ran,
+        "repaired": repaired,
+        "timed_out": timed_out,
+        "pinned": len(pinned),
+        "dropped_pins": dropped,
+        "patterns": len(patterns),
+        "pattern": i,
+        "counters": dict(counts + repair_counts),
+        "phase_counters": {"trials": dict(counts), "repair": dict(repair_counts)},
+        "phases": phases,
+    }
+
+
+def _fill_info(filled, unfilled, info, started):
+    """Completeness metadata attached to a generated crossword."""
+    total = len(filled) + unfilled
+    return {
+        "slots": total,
+        "filled": len(filled),
+        "complete": unfilled == 0,
+        "ratio": round(len(filled) / total, 3) if total else 0.0,
+        "trials": info["trials"],
+        "repaired": info["repaired"],
+        "timed_out": info["timed_out"],
+        "pinned": info["pinned"],
+        "dropped_pins": info["dropped_pins"],
+        "elapsed_ms": int((time.monotonic() - started) * 1000),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Generated puzzles are immutable and shared: the weekly cache, the puzzle
+# store and every session refer to the same Crossword. What differs per
+# session (the clue order of /start/random) is a CrosswordView over it.
+# ---------------------------------------------------------------------------
+@dataclass(frozen=True)
+class CrosswordClue:
+    numero: int
+    display_num: int
+    clue: str
+    answer: str
+    length: int
+    hint_letter: str
+    orientation: str
+    row: int
+    col: int
+
+
+@dataclass(frozen=True)
+class Crossword:
+    date: str
+    mode: str
+    form: str
+    hint: str
+    clues: tuple          # CrosswordClue, numbered in reading order
+    grid_size: int
+    black_cells: tuple    # (row, col)
+    fill: MappingProxyType
+    corpus: str = ""
+    week_id: tuple = None  # (ISO year, ISO week) of weekly modes
+    seed: int = None       # of quick crosswords, see quick_crossword_key()
+
+    def to_dict(self):
+        """Plain JSON-ready form (see from_dict)."""
+        return {
+            "date": self.date,
+            "mode": self.mode,
+            "form": self.form,
+            "hint": self.hint,
+            "clues": [asdict(c) for c in self.clues],
+            "grid_size": self.grid_size,
+            "black_cells": [list(c) for c in self.black_cells],
+            "fill": dict(self.fill),
+            "corpus": self.corpus,
+            "week_id": list(self.week_id) if self.week_id else None,
+            "seed": self.seed,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            date=data["date"],
+            mode=data["mode"],
+            form=data["form"],
+            hint=data["hint"],
+            clues=tuple(CrosswordClue(**c) for c in data["clues"]),
+            grid_size=data["grid_size"],
+            black_cells=tuple(tuple(c) for c in data["black_cells"]),
+            fill=MappingProxyType(dict(data["fill"])),
+            corpus=data.get("corpus", ""),
+            week_id=tuple(data["week_id"]) if data.get("week_id") else None,
+            seed=data.get("seed"),
+        )
+
+
+class CrosswordView:
+    """
+    A session's view of a shared Crossword.
+
+    *order* is a permutation of clue positions (None keeps reading order);
+    clues are served through it without copying the puzzle, and every
+    other attribute reads straight from the puzzle.
+    """
 
-        if entry:
-            filled.append((slot, entry))
-            filled_indices.add(idx)
-            for cell in slot['cells']:
-                for neighbor in cell_to_slots.get(cell, []):
-                    if neighbor in remaining:
-                        remaining.discard(neighbor)
-                        queue.append(neighbor)
+    __slots__ = ("puzzle", "order")
 
-    return filled, len(slots) - len(filled_indices), grid
+    def __init__(self, puzzle, order=None):
+        self.puzzle = puzzle
+        self.order = order
 
+    def __getattr__(self, name):
+        return getattr(self.puzzle, name)
 
-_daily_cache = {}
+    @property
+    def clues(self):
+        clues = self.puzzle.clues
+        if self.order is None or len(self.order) != len(clues):
+            return clues  # no order, or one drawn for a since-rebuilt puzzle
+        return tuple(clues[i] for i in self.order)
+
+
+_daily_cache = {}  # _weekly_key() -> crossword, at most _DAILY_CACHE_SIZE
+_DAILY_CACHE_SIZE = 8
+_daily_lock = threading.Lock()  # guards _daily_cache across request threads
+_puzzle_store = PuzzleStore(PUZZLE_STORE_DIR)
 
 
 def _get_week_id(today: date):
@@ -390,15 +1127,152 @@ def _get_week_id(today: date):
     return (iso[0], iso[1])
 
 
-def build_daily_crossword(today: date):
+def build_daily_crossword(today: date, budget=None, pinned=None):
+    """
+    Weekly 15x15 crossword, cached per ISO week, corpus and generator version.
+
+    Puzzles in the puzzle store, pre-generated (crossword_pregen.py) or from
+    an earlier generation, are served from there, so a restarted process
+    does not regenerate the week; otherwise the grid is generated on the
+    spot and stored.
+    *budget* caps generation in seconds (default crucigrama.tiempo_max); the
+    result's "fill" entry says how complete the grid is. Grids cut short by
+    the budget are not cached, so a later request can try again.
+
+    *pinned* lists words the grid must contain, each an answer or an
+    (answer, row, col, orientation) tuple fixing where it starts; by
+    default they come from the week's theme in crucigrama.temas. They are
+    placed first and the rest is filled around them; fill["pinned"] says
+    how many made it and fill["dropped_pins"] lists those left out (words
+    missing from the corpus or that no pattern has room for).
+    """
+    return _build_weekly(today, "weekly", budget, pinned)
+
+
+def build_large_crossword(today: date, budget=None):
+    """Weekly 21x21 crossword; works like build_daily_crossword."""
+    return _build_weekly(today, "large", budget)
+
+
+def _week_label(week_id):
+    # Zero-padded, so labels sort in week order
+    return f"{week_id[0]}W{week_id[1]:02d}"
+
+
+def _weekly_key(kind, week_id, fingerprint, pins=()):
+    key = (kind, _week_label(week_id), fingerprint, f"v{CROSSWORD_GENERATOR_VERSION}")
+    if pins:
+        key += ("t" + hashlib.sha1(repr(pins).encode("utf-8")).hexdigest()[:12],)
+    return key
+
+
+def _normalise_pins(pinned):
+    """
+    Pinned words as sorted (answer, position or None) pairs, the form
+    place_pinned() takes. Items are answers, (answer, row, col,
+    orientation) tuples or crucigrama.temas dicts.
+    """
+    pins = {}
+    for item in pinned or ():
+        if isinstance(item, str):
+            answer, position = item, None
+        elif isinstance(item, dict):
+            answer = item["respuesta"]
+            position = None
+            if item.get("fila") is not None:
+                position = (item["fila"], item["columna"], item.get("orientacion", "horizontal"))
+        else:
+            answer, *rest = item
+            if len(rest) == 1:  # (answer, position), as returned here
+                rest = rest[0] or ()
+            position = tuple(rest) if rest else None
+        pins.setdefault(answer.strip().lower(), position)
+    return tuple(sorted(pins.items()))
+
+
+def _week_pins(kind, week_id, pinned=None):
+    """*pinned*, or the theme of the week in crucigrama.temas (15x15 only)."""
+    if pinned is None:
+        pinned = CROSSWORD_THEMES.get(_week_label(week_id), ()) if kind == "weekly" else ()
+    return _normalise_pins(pinned)
+
+
+def _current_week_label():
+    return _week_label(_get_week_id(datetime.now(TZ).date()))
+
+
+def _remember(key, result):
+    """Keep a weekly crossword in memory, dropping past weeks and then the oldest."""
+    current = _current_week_label()
+    with _daily_lock:
+        for old in [k for k in _daily_cache if k[1] < current]:
+            del _daily_cache[old]
+        _daily_cache[key] = result
+        while len(_daily_cache) > _DAILY_CACHE_SIZE:
+            del _daily_cache[next(iter(_daily_cache))]
+
+
+def _persist(key, result):
+    """Write a generated weekly crossword to the store and evict past weeks there."""
+    current = _current_week_label()
+    try:
+        _puzzle_store.put(key, result.to_dict())
+        _puzzle_store.prune(lambda k: len(k) > 1 and k[1] >= current, PUZZLE_STORE_SIZE)
+    except OSError:
+        pass  # the store is an optimisation; the puzzle was still generated
+
+
+def cached_weekly_crossword(kind, week_id, fingerprint, pinned=None):
+    """The weekly crossword of a corpus fingerprint if already generated, else None."""
+    key = _weekly_key(kind, week_id, fingerprint, _week_pins(kind, week_id, pinned))
+    with _daily_lock:
+        result = _daily_cache.get(key)
+    if result is None:
+        data = _puzzle_store.get(key)
+        if data is not None:
+            try:
+                result = Crossword.from_dict(data)
+            except (KeyError, TypeError):
+                return None  # written by an incompatible version
+            _remember(key, result)
+    return result
+
+
+def _build_weekly(today, kind, budget, pinned=None):
     week_id = _get_week_id(today)
-    if week_id in _daily_cache:
-        return _daily_cache[week_id]
+    pins = _week_pins(kind, week_id, pinned)
+    index, fingerprint = _corpus.current()
+    result = cached_weekly_crossword(kind, week_id, fingerprint, pins)
+    if result is not None:
+        return result
+    # Single flight: across threads and worker processes only the holder of
+    # the key's lock generates; the rest wait and then read what it stored
+    key = _weekly_key(kind, week_id, fingerprint, pins)
+    with _puzzle_store.lock(key):
+        result = cached_weekly_crossword(kind, week_id, fingerprint, pins)
+        if result is None:
+            result = generate_weekly_crossword(today, kind, budget, index, fingerprint, pins)
+            if not result.fill["timed_out"]:
+                _remember(key, result)
+                _persist(key, result)
+    return result
+
 
-    entries = load_word_entries()
+def generate_weekly_crossword(today, kind="weekly", budget=None, index=None, fingerprint=None,
+                              pinned=None):
+    """Generate the weekly crossword of *kind* ("weekly" or "large") without any caching."""
+    week_id = _get_week_id(today)
+    pins = _week_pins(kind, week_id, pinned)
+    started = time.monotonic()
+    if budget is None:
+        budget = CROSSWORD_TIME_BUDGET
+
+    phases = _Phases()
+    if index is None:
+        index, fingerprint = _corpus.current()
+    phases.done("index")
     week_seed = week_id[0] * 100 + week_id[1]
-    rnd = random.Random(week_seed)
-    rnd.shuffle(entries)
+    rnd = random.Random(week_seed if kind == "weekly" else f"{kind}-{week_seed}")
 
     form_index = week_seed % 3
     if form_index == 0:
@@ -411,32 +1285,17 @@ def build_daily_crossword(today: date):
         form_name = "Letra inicial"
         form_hint = "Se muestra la primera letra de cada respuesta."
 
-    grid_size = 15
-
-    # Try ALL patterns with multiple shuffles, keep the best fill
-    best_filled = []
-    best_unfilled = 999
-    best_black = set()
-    for pattern in GRID_PATTERNS:
-        slots, black_cells = _extract_slots(pattern)
-        for _ in range(3):
-            trial_entries = entries[:]
-            trial_rnd = random.Random(rnd.randint(0, 2**31))
-            trial_rnd.shuffle(trial_entries)
-            filled, unfilled, grid = _fill_grid(slots, trial_entries, trial_rnd, grid_size)
-            if unfilled < best_unfilled:
-                best_filled = filled
-                best_unfilled = unfilled
-                best_black = black_cells
-            if unfilled == 0:
-                break
-        if best_unfilled == 0:
-            break
+    # Try the patterns in fillability order, keep the best fill. The solver's
+    # answer for a pattern is final; greedy fills get a few shuffles each.
+    best_filled, best_unfilled, best_geometry, info = _generate_best(kind, index, rnd, 3, budget,
+                                                                     phases, pins)
+    best_black = best_geometry.black
+    grid_size = best_geometry.size
 
     # Assign display numbers in reading order (standard crossword numbering)
     start_cells = set()
     for slot, entry in best_filled:
-        start_cells.add(tuple(slot['cells'][0]))
+        start_cells.add((slot.row, slot.col))
     display_nums = {}
     counter = 1
     for r in range(grid_size):
@@ -446,67 +1305,67 @@ def build_daily_crossword(today: date):
                 counter += 1
 
     # Sort filled slots in reading order and build clues
-    filled_sorted = sorted(best_filled, key=lambda x: (x[0]['cells'][0][0], x[0]['cells'][0][1], 0 if x[0]['orient'] == 'horizontal' else 1))
+    filled_sorted = sorted(best_filled, key=lambda x: (x[0].row, x[0].col, 0 if x[0].orient == 'horizontal' else 1))
     clues = []
     for clue_id, (slot, entry) in enumerate(filled_sorted, 1):
         answer = entry["answer"].lower()
-        start = tuple(slot['cells'][0])
-        clues.append({
-            "numero": clue_id,
-            "display_num": display_nums[start],
-            "clue": entry["clue"],
-            "answer": answer,
-            "length": len(answer),
-            "hint_letter": answer[0] if form_index == 2 else "",
-            "orientation": "horizontal" if slot['orient'] == 'horizontal' else "vertical",
-            "row": slot['row'],
-            "col": slot['col'],
-        })
-
-    result = {
-        "date": today.isoformat(),
-        "week_id": list(week_id),
-        "mode": "weekly",
-        "form": form_name,
-        "hint": form_hint,
-        "clues": clues,
-        "grid_size": grid_size,
-        "black_cells": [list(c) for c in best_black],
-    }
-    _daily_cache[week_id] = result
+        start = (slot.row, slot.col)
+        clues.append(CrosswordClue(
+            numero=clue_id,
+            display_num=display_nums[start],
+            clue=_pick_clue(entry, rnd),
+            answer=answer,
+            length=len(answer),
+            hint_letter=answer[0] if form_index == 2 else "",
+            orientation=slot.orient,
+            row=slot.row,
+            col=slot.col,
+        ))
+
+    result = Crossword(
+        date=today.isoformat(),
+        week_id=week_id,
+        mode=kind,
+        form=form_name,
+        hint=form_hint,
+        clues=tuple(clues),
+        grid_size=grid_size,
+        black_cells=tuple(sorted(best_black)),
+        fill=MappingProxyType(_fill_info(best_filled, best_unfilled, info, started)),
+        corpus=fingerprint,
+    )
+    phases.done("clues")
+    _record_generation(kind, info, result.fill)
     return result
 
 
 
-def build_quick_crossword():
-    entries = load_word_entries()
-    rnd = random.Random()
-    rnd.shuffle(entries)
+def build_quick_crossword(budget=None, seed=None):
+    """
+    Random 6x6 crossword; *budget* works as in build_daily_crossword.
+
+    A given *seed* always produces the same grid for the same corpus
+    (unless the fill runs out of time); without one a seed is drawn and
+    kept in the crossword, so quick_crossword_key() can address it.
+    """
+    started = time.monotonic()
+    if budget is None:
+        budget = CROSSWORD_TIME_BUDGET
+    if seed is None:
+        seed = _new_seed()
+    phases = _Phases()
+    index, fingerprint = _corpus.current()
+    phases.done("index")
+    rnd = random.Random(seed)
 
     grid_size = 6
 
-    best_filled = []
-    best_unfilled = 999
-    best_black = set()
-    for pattern in GRID_PATTERNS_QUICK:
-        slots, black_cells = _extract_slots(pattern)
-        for _ in range(8):
-            trial_entries = entries[:]
-            trial_rnd = random.Random(rnd.randint(0, 2**31))
-            trial_rnd.shuffle(trial_entries)
-            filled, unfilled, grid = _fill_grid(slots, trial_entries, trial_rnd, grid_size)
-            if unfilled < best_unfilled:
-                best_filled = filled
-                best_unfilled = unfilled
-                best_black = black_cells
-            if unfilled == 0:
-                break
-        if best_unfilled == 0:
-            break
+    best_filled, best_unfilled, best_geometry, info = _generate_best("quick", index, rnd, 8, budget, phases)
+    best_black = best_geometry.black
 
     start_cells = set()
     for slot, entry in best_filled:
-        start_cells.add(tuple(slot['cells'][0]))
+        start_cells.add((slot.row, slot.col))
     display_nums = {}
     counter = 1
     for r in range(grid_size):
@@ -515,32 +1374,335 @@ def build_quick_crossword():
                 display_nums[(r, c)] = counter
                 counter += 1
 
-    filled_sorted = sorted(best_filled, key=lambda x: (x[0]['cells'][0][0], x[0]['cells'][0][1], 0 if x[0]['orient'] == 'horizontal' else 1))
+    filled_sorted = sorted(best_filled, key=lambda x: (x[0].row, x[0].col, 0 if x[0].orient == 'horizontal' else 1))
     clues = []
     for clue_id, (slot, entry) in enumerate(filled_sorted, 1):
         answer = entry["answer"].lower()
-        start = tuple(slot['cells'][0])
-        clues.append({
-            "numero": clue_id,
-            "display_num": display_nums[start],
-            "clue": entry["clue"],
-            "answer": answer,
-            "length": len(answer),
-            "hint_letter": "",
-            "orientation": "horizontal" if slot['orient'] == 'horizontal' else "vertical",
-            "row": slot['row'],
-            "col": slot['col'],
-        })
+        start = (slot.row, slot.col)
+        clues.append(CrosswordClue(
+            numero=clue_id,
+            display_num=display_nums[start],
+            clue=_pick_clue(entry, rnd),
+            answer=answer,
+            length=len(answer),
+            hint_letter="",
+            orientation=slot.orient,
+            row=slot.row,
+            col=slot.col,
+        ))
 
-    return {
-        "date": datetime.now(TZ).date().isoformat(),
-        "mode": "quick",
-        "form": "Partida rápida",
-        "hint": "Un crucigrama rápido de 6×6.",
-        "clues": clues,
-        "grid_size": grid_size,
-        "black_cells": [list(c) for c in best_black],
-    }
+    result = Crossword(
+        date=datetime.now(TZ).date().isoformat(),
+        mode="quick",
+        form="Partida rápida",
+        hint="Un crucigrama rápido de 6×6.",
+        clues=tuple(clues),
+        grid_size=grid_size,
+        black_cells=tuple(sorted(best_black)),
+        fill=MappingProxyType(_fill_info(best_filled, best_unfilled, info, started)),
+        corpus=fingerprint,
+        seed=seed,
+    )
+    phases.done("clues")
+    _record_generation("quick", info, result.fill)
+    return result
+
+
+class GenerationBusy(Exception):
+    """Raised by GenerationGate.run() when every worker and queue slot is taken."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"generation queue full, retry in {retry_after} s")
+        self.retry_after = retry_after
+
+
+class GenerationGate:
+    """
+    Admission control for CPU-bound generations run on a request.
+
+    run(fn) calls fn in the caller's thread once one of *workers* slots is
+    free. Up to *queue* callers wait for a slot in arrival order; any
+    caller beyond that gets GenerationBusy at once, with a Retry-After
+    estimated from the recent run times, instead of piling more work onto
+    saturated cores. Wait times of the last *history* admitted calls are
+    kept for stats().
+    """
+
+    def __init__(self, workers, queue, history=100):
+        self.workers = max(1, workers)
+        self.queue = max(0, queue)
+        self._cond = threading.Condition()
+        self._running = 0
+        self._waiting = deque()  # tickets of queued callers, oldest first
+        self._next_ticket = 0
+        self._waits_ms = deque(maxlen=history)
+        self._run_s = 1.0        # moving average of one run, in seconds
+        self.admitted = 0
+        self.rejected = 0
+        self.max_depth = 0
+
+    def run(self, fn, *args, **kwargs):
+        arrived = time.monotonic()
+        with self._cond:
+            if self._running >= self.workers or self._waiting:
+                if len(self._waiting) >= self.queue:
+                    self.rejected += 1
+                    raise GenerationBusy(self._retry_after())
+                ticket = self._next_ticket
+                self._next_ticket += 1
+                self._waiting.append(ticket)
+                self.max_depth = max(self.max_depth, len(self._waiting))
+                while self._running >= self.workers or self._waiting[0] != ticket:
+                    self._cond.wait()
+                self._waiting.popleft()
+                # The next in line may have woken (and gone back to sleep)
+                # before this caller left the head of the queue
+                self._cond.notify_all()
+            self._running += 1
+            self.admitted += 1
+            started = time.monotonic()
+            self._waits_ms.append(int((started - arrived) * 1000))
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._run_s += (time.monotonic() - started - self._run_s) * 0.2
+                self._cond.notify_all()
+
+    def _retry_after(self):
+        """Seconds until the queue has likely drained by one slot (at least 1)."""
+        backlog = self._running + len(self._waiting)
+        return max(1, math.ceil(self._run_s * backlog / self.workers))
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits_ms)
+            stats = {
+                "workers": self.workers,
+                "queue": self.queue,
+                "running": self._running,
+                "depth": len(self._waiting),
+                "max_depth": self.max_depth,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "run_ms": int(self._run_s * 1000),
+            }
+        stats["wait_ms"] = {
+            "p50": waits[len(waits) // 2] if waits else 0,
+            "p90": waits[min(len(waits) - 1, len(waits) * 9 // 10)] if waits else 0,
+            "max": waits[-1] if waits else 0,
+        }
+        return stats
+
+
+_generation_gate = GenerationGate(GENERATION_WORKERS, GENERATION_QUEUE, GENERATION_LOG_SIZE)
+
+
+# ---------------------------------------------------------------------------
+# Seed-addressed puzzles: a quick crossword or a sudoku is fully determined
+# by a small key of generator version, mode and seed (plus the corpus
+# fingerprint for crosswords), so sessions and URLs carry the key and any
+# worker rebuilds the puzzle from it. Rebuilt puzzles are kept in an LRU.
+# ---------------------------------------------------------------------------
+def _new_seed():
+    return random.getrandbits(32)
+
+
+class PuzzleLRU:
+    """Thread-safe key -> puzzle map keeping the *size* most recently used."""
+
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            puzzle = self._items.get(key)
+            if puzzle is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items.move_to_end(key)
+            return puzzle
+
+    def put(self, key, puzzle):
+        with self._lock:
+            self._items[key] = puzzle
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "cached": len(self._items),
+                    "hits": self.hits, "misses": self.misses}
+
+
+_seeded_cache = PuzzleLRU(SEEDED_CACHE_SIZE)
+# Weekly crosswords cut short by the time budget are never cached under
+# their week's key (a later request may do better); sessions started on
+# one find it here, under a key of its own, in the process that made it
+_draft_crosswords = PuzzleLRU(SEEDED_CACHE_SIZE)
+
+
+def quick_crossword_key(crossword):
+    """
+    (version, "quick", seed, corpus, pattern set) key of a quick crossword,
+    or None when it cannot be rebuilt from one (its fill ran out of time,
+    so a rebuild could come out different).
+    """
+    if crossword.seed is None or crossword.fill["timed_out"]:
+        return None
+    key = (CROSSWORD_GENERATOR_VERSION, "quick", crossword.seed, crossword.corpus,
+           QUICK_PATTERNS_FINGERPRINT)
+    _seeded_cache.put(key, crossword)
+    return key
+
+
+def seeded_quick_crossword(key):
+    """
+    The quick crossword of a quick_crossword_key(), rebuilt through the
+    generation gate on a cache miss; None when the key is from another
+    generator version, pattern set or a corpus that has since been
+    reloaded, or when the rebuild ran out of time (it may differ then).
+    """
+    key = tuple(key)
+    if len(key) != 5:
+        return None
+    version, _, seed, corpus, patterns = key
+    crossword = _seeded_cache.get(key)
+    if crossword is None:
+        if (version != CROSSWORD_GENERATOR_VERSION or patterns != QUICK_PATTERNS_FINGERPRINT
+                or corpus != _corpus.current()[1]):
+            return None
+        crossword = _generation_gate.run(build_quick_crossword, seed=seed)
+        if crossword.corpus != corpus or crossword.fill["timed_out"]:
+            return None  # reloaded while queued, or possibly not the same grid
+        _seeded_cache.put(key, crossword)
+    return crossword
+
+
+def seeded_sudoku(version, difficulty, seed):
+    """
+    (puzzle, solution) of a (version, difficulty, seed) sudoku key as
+    tuples of row tuples, rebuilt through the generation gate on a cache
+    miss; None when the key is from another generator version.
+    """
+    key = (version, difficulty, seed)
+    sudoku = _seeded_cache.get(key)
+    if sudoku is None:
+        if version != SUDOKU_GENERATOR_VERSION:
+            return None
+        puzzle, solution = _generation_gate.run(_sudoku_generate, difficulty, seed)
+        sudoku = (tuple(map(tuple, puzzle)), tuple(map(tuple, solution)))
+        _seeded_cache.put(key, sudoku)
+    return sudoku
+
+
+class QuickPool:
+    """
+    Ready-made quick crosswords, kept topped up by a background thread.
+
+    take() hands out a pooled puzzle when there is one (a hit) and builds
+    one on the spot otherwise (a miss); either way it wakes the refiller,
+    which generates puzzles one at a time, at most one per *interval*
+    seconds, until *size* are ready again. A miss builds through the
+    generation gate, so it may raise GenerationBusy. Puzzles built from a corpus that
+    has since been reloaded are thrown away instead of served. The thread
+    starts on first use, so every forked web worker gets its own.
+    """
+
+    def __init__(self, size, interval, build):
+        self.size = size
+        self.interval = interval
+        self._build = build
+        self._ready = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._short_since = None  # when the pool last dropped below size
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.discarded = 0
+        self.last_lag_ms = 0      # time the last refill took to get back to size
+        self.max_lag_ms = 0
+
+    def take(self):
+        if self.size <= 0:
+            return _generation_gate.run(self._build)
+        self._ensure_thread()
+        fingerprint = _corpus.current()[1]
+        puzzle = None
+        with self._lock:
+            while self._ready and puzzle is None:
+                puzzle = self._ready.popleft()
+                if puzzle.corpus != fingerprint:
+                    self.discarded += 1
+                    puzzle = None
+            if puzzle is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if self._short_since is None:
+                self._short_since = time.monotonic()
+        self._wake.set()
+        if puzzle is None:
+            return _generation_gate.run(self._build)
+        # Pooled puzzles may have been built on an earlier day
+        return replace(puzzle, date=datetime.now(TZ).date().isoformat())
+
+    def stats(self):
+        with self._lock:
+            ready = len(self._ready)
+            short_since = self._short_since
+        return {
+            "size": self.size,
+            "ready": ready,
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "discarded": self.discarded,
+            "lag_ms": int((time.monotonic() - short_since) * 1000) if short_since else 0,
+            "last_lag_ms": self.last_lag_ms,
+            "max_lag_ms": self.max_lag_ms,
+        }
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._short_since = self._short_since or time.monotonic()
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            # Cleared before looking, so a take() racing with the check
+            # below still leaves the event set for the wait
+            self._wake.clear()
+            while len(self._ready) < self.size:
+                try:
+                    puzzle = self._build()
+                except Exception:
+                    time.sleep(max(self.interval, 1.0))
+                    continue
+                with self._lock:
+                    self._ready.append(puzzle)
+                    self.generated += 1
+                    if len(self._ready) >= self.size and self._short_since is not None:
+                        self.last_lag_ms = int((time.monotonic() - self._short_since) * 1000)
+                        self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+                        self._short_since = None
+                time.sleep(self.interval)
+            self._wake.wait()
+
+
+_quick_pool = QuickPool(QUICK_POOL_SIZE, QUICK_POOL_INTERVAL, build_quick_crossword)
 
 
 def wordle_feedback(attempt: str, target: str) -> str:
@@ -571,16 +1733,16 @@ def wordle_feedback(attempt: str, target: str) -> str:
 
 def place_crossword_words(crossword):
     coords = {}
-    for clue in crossword["clues"]:
-        answer = clue["answer"]
-        if clue.get("orientation") == "vertical":
-            col = clue.get("col", 0)
-            row = clue.get("row", 0)
-            coords[clue["numero"]] = [(row + r, col) for r in range(len(answer))]
+    for clue in crossword.clues:
+        answer = clue.answer
+        if clue.orientation == "vertical":
+            col = clue.col
+            row = clue.row
+            coords[clue.numero] = [(row + r, col) for r in range(len(answer))]
         else:
-            row = clue.get("row", 0)
-            col = clue.get("col", 0)
-            coords[clue["numero"]] = [(row, col + c) for c in range(len(answer))]
+            row = clue.row
+            col = clue.col
+            coords[clue.numero] = [(row, col + c) for c in range(len(answer))]
     return coords
 
 
@@ -589,25 +1751,25 @@ def build_crossword_board_data(crossword, solved):
     if not positions:
         return [], {}
 
-    grid_size = crossword.get("grid_size", 15)
+    grid_size = crossword.grid_size
 
     solved_set = set(solved)
     solved_cells = {}
-    for clue in crossword["clues"]:
-        n = clue["numero"]
+    for clue in crossword.clues:
+        n = clue.numero
         if n in solved_set:
             for idx, cell in enumerate(positions.get(n, [])):
-                if idx < len(clue["answer"]):
-                    solved_cells[cell] = clue["answer"][idx].upper()
+                if idx < len(clue.answer):
+                    solved_cells[cell] = clue.answer[idx].upper()
 
     # Use display_num for cell numbers (standard crossword numbering)
     number_cells = {}
-    for clue in crossword["clues"]:
-        coords = positions.get(clue["numero"], [])
+    for clue in crossword.clues:
+        coords = positions.get(clue.numero, [])
         if coords:
             cell = coords[0]
             if cell not in number_cells:
-                number_cells[cell] = clue.get("display_num", clue["numero"])
+                number_cells[cell] = clue.display_num
 
     filled_set = set()
     for pos_list in positions.values():
@@ -655,8 +1817,8 @@ def render_crossword_board(crossword, solved, attempts):
 
     solved_letters = set(solved)
     clue_labels = " | ".join(
-        f"{c['numero']}: {c['answer']}" if c['numero'] in solved_letters else f"{c['numero']}: {c['length']}"
-        for c in crossword['clues']
+        f"{c.numero}: {c.answer}" if c.numero in solved_letters else f"{c.numero}: {c.length}"
+        for c in crossword.clues
     )
 
     return "\n".join(lines) + "\n\n" + clue_labels
@@ -714,27 +1876,96 @@ def create_app():
     def index():
         return redirect(url_for("games_hub"))
 
+    @app.errorhandler(GenerationBusy)
+    def generation_busy(exc):
+        message = f"Hay demasiadas partidas generándose. Vuelve a intentarlo en {exc.retry_after} s."
+        return message, 503, {"Retry-After": str(exc.retry_after), "Content-Type": "text/plain; charset=utf-8"}
+
+    def _playable(crossword):
+        # A grid without a single word cannot be played (and would count
+        # as solved at once); answer like an overloaded server instead
+        if not crossword.clues:
+            raise GenerationBusy(1)
+        return crossword
+
+    def _weekly_crossword(kind, today):
+        """This week's crossword; generating it (on a miss) goes through the gate."""
+        build = build_large_crossword if kind == "large" else build_daily_crossword
+        cached = cached_weekly_crossword(kind, _get_week_id(today), _corpus.current()[1])
+        return _playable(cached or _generation_gate.run(build, today))
+
+    def _session_reference(crossword, order=None):
+        # Crosswords are shared and too big for the session cookie: keep a
+        # reference and look the (per-week cached) puzzle up on each request.
+        ref = {
+            "mode": crossword.mode,
+            "date": crossword.date,
+            "week_id": list(crossword.week_id),
+            "corpus": crossword.corpus,
+            "order": order,
+        }
+        if crossword.fill["timed_out"]:
+            ref["draft"] = os.urandom(6).hex()
+            _draft_crosswords.put(ref["draft"], crossword)
+        return ref
+
+    def _stale_week(ref):
+        """Whether a weekly session reference is from an earlier week (Spain time)."""
+        if ref.get("mode") == "quick":
+            return False
+        return tuple(ref.get("week_id") or ()) != _get_week_id(datetime.now(TZ).date())
+
+    def _session_crossword():
+        ref = session.get("crossword")
+        if ref is None:
+            return None
+        try:
+            if ref["mode"] == "quick":
+                if "key" in ref:
+                    puzzle = seeded_quick_crossword(ref["key"])
+                    if puzzle is None:
+                        session.pop("crossword", None)  # corpus reloaded since
+                        return None
+                    return CrosswordView(puzzle)
+                return CrosswordView(Crossword.from_dict(ref["puzzle"]))
+            kind = "large" if ref["mode"] == "large" else "weekly"
+            week_id, corpus = tuple(ref["week_id"]), ref["corpus"]
+        except (KeyError, TypeError):
+            session.pop("crossword", None)  # cookie from an older version
+            return None
+        # Strictly the grid the session started on: rebuilding it could
+        # give another one, which the solved clue numbers would not match
+        if "draft" in ref:
+            puzzle = _draft_crosswords.get(ref["draft"])
+        else:
+            puzzle = cached_weekly_crossword(kind, week_id, corpus)
+        if puzzle is None:
+            session.pop("crossword", None)
+            return None
+        return CrosswordView(puzzle, ref.get("order"))
+
     @app.route("/crossword")
     def crossword_page():
-        crossword = session.get("crossword")
+        # Si el crucigrama semanal es de otra semana (hora España), reiniciar
+        # sin buscarlo: ya no está guardado y habría que generarlo de nuevo
+        ref = session.get("crossword")
+        if ref is not None and _stale_week(ref):
+            if ref.get("mode") == "large":
+                return redirect(url_for("start_large"))
+            return redirect(url_for("start_daily"))
+        crossword = _session_crossword()
         if crossword is None:
             return redirect(url_for("games_hub"))
-        # Si el crucigrama semanal es de otra semana (hora España), reiniciar
-        if crossword.get("mode") != "quick":
-            today_spain = datetime.now(TZ).date()
-            current_week = list(_get_week_id(today_spain))
-            if crossword.get("week_id") != current_week:
-                return redirect(url_for("start_daily"))
         solved = set(session.get("solved", []))
         attempts = session.get("attempts", {})
         board_text = render_crossword_board(crossword, solved, attempts)
         board_grid, clue_positions = build_crossword_board_data(crossword, solved)
         grid_cols = len(board_grid[0]) if board_grid else 6
-        pending = [str(c["numero"]) for c in crossword["clues"] if c["numero"] not in solved]
+        pending = [str(c.numero) for c in crossword.clues if c.numero not in solved]
 
         time_remaining = -1
         time_expired = False
-        if crossword.get("mode") == "quick":
+        if crossword.mode == "quick":
             qs = session.get("quick_start")
             if qs:
                 elapsed = (datetime.now(TZ) - datetime.fromisoformat(qs)).total_seconds()
@@ -763,19 +1994,29 @@ def create_app():
     @app.route("/start/daily")
     def start_daily():
         today_spain = datetime.now(TZ).date()
-        crossword = build_daily_crossword(today_spain)
-        session["crossword"] = crossword
+        crossword = _weekly_crossword("weekly", today_spain)
+        session["crossword"] = _session_reference(crossword)
         session["solved"] = []
         session["attempts"] = {}
         session["message"] = "Crucigrama semanal iniciado."
         return redirect(url_for("crossword_page"))
 
+    @app.route("/start/large")
+    def start_large():
+        today_spain = datetime.now(TZ).date()
+        crossword = _weekly_crossword("large", today_spain)
+        session["crossword"] = _session_reference(crossword)
+        session["solved"] = []
+        session["attempts"] = {}
+        session["message"] = "Crucigrama gigante iniciado."
+        return redirect(url_for("crossword_page"))
+
     @app.route("/start/random")
     def start_random():
         today_spain = datetime.now(TZ).date()
-        crossword = build_daily_crossword(today_spain)
-        random.shuffle(crossword["clues"])
-        session["crossword"] = crossword
+        crossword = _weekly_crossword("weekly", today_spain)
+        n = len(crossword.clues)
+        session["crossword"] = _session_reference(crossword, random.sample(range(n), n))
         session["solved"] = []
         session["attempts"] = {}
         session["message"] = "Crucigrama aleatorio iniciado."
@@ -783,8 +2024,19 @@ def create_app():
 
     @app.route("/start/quick")
     def start_quick():
-        crossword = build_quick_crossword()
-        session["crossword"] = crossword
+        crossword = None
+        seed = request.args.get("seed", type=int)
+        if seed is not None:
+            key = (CROSSWORD_GENERATOR_VERSION, "quick", seed, _corpus.current()[1],
+                   QUICK_PATTERNS_FINGERPRINT)
+            crossword = seeded_quick_crossword(key)
+        if crossword is None:
+            crossword = _playable(_quick_pool.take())
+        key = quick_crossword_key(crossword)
+        if key is None:
+            session["crossword"] = {"mode": "quick", "puzzle": crossword.to_dict()}
+        else:
+            session["crossword"] = {"mode": "quick", "key": list(key)}
         session["solved"] = []
         session["attempts"] = {}
         session["quick_start"] = datetime.now(TZ).isoformat()
@@ -793,10 +2045,14 @@ def create_app():
 
     @app.route("/guess", methods=["POST"])
     def guess():
-        crossword = session.get("crossword")
-        if crossword is None:
+        ref = session.get("crossword")
+        if ref is not None and _stale_week(ref):
+            return redirect(url_for("crossword_page"))
+        crossword = _session_crossword()
+        if crossword is None or not crossword.clues:
+            session.pop("crossword", None)
             return redirect(url_for("start"))
-        if crossword.get("mode") == "quick":
+        if crossword.mode == "quick":
             qs = session.get("quick_start")
             if qs:
                 elapsed = (datetime.now(TZ) - datetime.fromisoformat(qs)).total_seconds()
@@ -808,28 +2064,28 @@ def create_app():
         except ValueError:
             numero = 0
         palabra = request.form.get("palabra", "").strip().lower()
-        clue = next((c for c in crossword["clues"] if c["numero"] == numero), None)
+        clue = next((c for c in crossword.clues if c.numero == numero), None)
         if clue is None:
             session["message"] = "Número de pista inválido."
             return redirect(url_for("crossword_page"))
-        if len(palabra) != len(clue["answer"]):
-            session["message"] = f"La respuesta debe tener {len(clue['answer'])} letras."
+        if len(palabra) != len(clue.answer):
+            session["message"] = f"La respuesta debe tener {len(clue.answer)} letras."
             return redirect(url_for("crossword_page"))
 
         attempts = session.setdefault("attempts", {})
         attempts.setdefault(str(numero), []).append(palabra)
         session["attempts"] = attempts
 
-        feedback = wordle_feedback(palabra, clue["answer"])
+        feedback = wordle_feedback(palabra, clue.answer)
         solved = set(session.get("solved", []))
-        if palabra == clue["answer"]:
+        if palabra == clue.answer:
             solved.add(numero)
             session["solved"] = list(solved)
             session["message"] = f"{feedback}  ✓ Correcto!"
         else:
             session["message"] = f"{feedback}  ✗ Incorrecto, prueba otra vez."
 
-        if len(solved) == len(crossword["clues"]):
+        if len(solved) == len(crossword.clues):
             session["message"] = "🎉 ¡Has resuelto el crucigrama!"
             session.pop("crossword", None)
             session.pop("solved", None)
@@ -837,6 +2093,15 @@ def create_app():
 
         return redirect(url_for("crossword_page"))
     
+    @app.route("/admin/crossword/metrics")
+    def crossword_metrics():
+        """Recent crossword generation records (see generation_metrics)."""
+        token = request.args.get("token") or request.headers.get("X-Admin-Token")
+        allowed = bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+        if not allowed:
+            return jsonify({"error": "forbidden"}), 403
+        return jsonify(generation_metrics())
+
     @app.route("/api-dashboard")
     def api_dashboard():
         status_data, status_error = api_get_json("/status")
@@ -867,22 +2132,23 @@ def create_app():
     def sudoku_start_game(difficulty):
         if difficulty not in SUDOKU_DIFFICULTIES:
             difficulty = "medio"
-        puzzle, sol = _sudoku_generate(difficulty)
-        session["sudoku_puzzle"] = puzzle
-        session["sudoku_solution"] = sol
-        session["sudoku_board"] = [row[:] for row in puzzle]
-        session["sudoku_given"] = [[1 if puzzle[r][c] != 0 else 0 for c in range(9)] for r in range(9)]
-        session["sudoku_difficulty"] = difficulty
+        seed = request.args.get("seed", type=int)
+        if seed is None:
+            seed = _new_seed()
+        # Built now so an overloaded server refuses here rather than on play
+        seeded_sudoku(SUDOKU_GENERATOR_VERSION, difficulty, seed)
+        session["sudoku"] = [SUDOKU_GENERATOR_VERSION, difficulty, seed]
         return redirect(url_for("sudoku_play"))
 
     @app.route("/sudoku/play")
     def sudoku_play():
-        board = session.get("sudoku_board")
-        if board is None:
+        key = session.get("sudoku")
+        sudoku = seeded_sudoku(*key) if key else None
+        if sudoku is None:
             return redirect(url_for("sudoku_menu"))
-        sol = session.get("sudoku_solution", [[0]*9]*9)
-        given = session.get("sudoku_given", [[0]*9]*9)
-        diff = session.get("sudoku_difficulty", "medio")
+        board, sol = sudoku
+        given = [[1 if board[r][c] != 0 else 0 for c in range(9)] for r in range(9)]
+        diff = key[1]
         empty_count = sum(1 for r in range(9) for c in range(9) if given[r][c] == 0)
         return render_template(
             "sudoku.html",